@@ -1,38 +1,181 @@
 import pygame
 import sys
+import os
+import io
 import math
+import json
+import struct
+import hashlib
+import time
 import asyncio
+import argparse
+import threading
+import queue
+from array import array
+from collections import OrderedDict, deque
+from itertools import islice
+from bisect import bisect_left, bisect_right
+try:
+    import sqlite3
+except ImportError:  # Not every web build ships it; runs are then just not saved
+    sqlite3 = None
+
+# --- Kinematic platforms ---
+class KinematicPlatforms:
+    """Every moving platform in parallel arrays; positions are a closed-form function of elapsed time"""
+    def __init__(self):
+        self.rects = []       # Positions at the current tick, read by collision and hazard checks
+        self.draw_rects = []  # Positions at the interpolated render time
+        self.axis = array("b")   # 0 moves along x, 1 along y
+        self.start = array("d")  # Left/top coordinate at time 0
+        self.low = array("d")    # Travel range of the left/top coordinate
+        self.high = array("d")
+        self.speed = array("d")
+
+    def clear(self):
+        for column in (self.rects, self.draw_rects, self.axis, self.start, self.low, self.high, self.speed):
+            del column[:]
+
+    def add(self, x, y, width, height, movement_axis, min_pos, max_pos, speed):
+        axis = 0 if movement_axis == "x" else 1
+        size = width if axis == 0 else height
+        self.rects.append(pygame.Rect(x, y, width, height))
+        self.draw_rects.append(pygame.Rect(x, y, width, height))
+        self.axis.append(axis)
+        self.start.append(x if axis == 0 else y)
+        self.low.append(min_pos)
+        self.high.append(max_pos - size)
+        self.speed.append(speed)
+        return len(self.rects) - 1
+
+    def travel_rect(self, index):
+        """Everything a platform covers over its whole path"""
+        rect = self.rects[index].copy()
+        low = min(self.low[index], self.start[index])
+        high = max(self.high[index], self.start[index])
+        if self.axis[index] == 0:
+            rect.x, rect.width = low, high - low + rect.width
+        else:
+            rect.y, rect.height = low, high - low + rect.height
+        return rect
+
+    def update(self, t, rects=None):
+        """Place every platform's collision rect (or the matching rect in rects, e.g. draw_rects) at time t
+
+        The one implementation of the ping-pong path, out to high first and then bouncing between low and high, so the
+        simulation, rewind, replays and drawing all agree.
+        """
+        if rects is None:
+            rects = self.rects
+        for rect, axis, start, low, high, speed in zip(rects, self.axis, self.start, self.low, self.high, self.speed):
+            span = high - low
+            travel = speed * t
+            if span <= 0:
+                position = start
+            elif start < high:
+                first_leg = high - start
+                if travel <= first_leg:
+                    position = start + travel
+                else:
+                    phase = (travel - first_leg) % (2 * span)
+                    position = high - phase if phase <= span else low + (phase - span)
+            else:
+                first_leg = start - low
+                if travel <= first_leg:
+                    position = start - travel
+                else:
+                    phase = (travel - first_leg) % (2 * span)
+                    position = low + phase if phase <= span else high - (phase - span)
+            if axis == 0:
+                rect.x = position
+            else:
+                rect.y = position
+
+kinematic_platforms = KinematicPlatforms()
 
-# Platform class for moving platforms
 class MovingPlatform:
+    """A platform's slot in kinematic_platforms"""
+    __slots__ = ("index", "rect", "draw_rect")
+
     def __init__(self, x, y, width, height, movement_axis, min_pos, max_pos, speed=50):
-        self.rect = pygame.Rect(x, y, width, height)
-        self.movement_axis = movement_axis
-        self.min_pos = min_pos
-        self.max_pos = max_pos
-        self.speed = speed
-        self.direction = 1
-
-    def update(self, dt):
-        if self.movement_axis == "x":
-            self.rect.x += self.speed * dt * self.direction
-            if self.direction == 1 and self.rect.right >= self.max_pos:
-                self.direction = -1
-            elif self.direction == -1 and self.rect.left <= self.min_pos:
-                self.direction = 1
-        elif self.movement_axis == "y":
-            self.rect.y += self.speed * dt * self.direction
-            if self.direction == 1 and self.rect.bottom >= self.max_pos:
-                self.direction = -1
-            elif self.direction == -1 and self.rect.top <= self.min_pos:
-                self.direction = 1
+        self.index = kinematic_platforms.add(x, y, width, height, movement_axis, min_pos, max_pos, speed)
+        self.rect = kinematic_platforms.rects[self.index]
+        self.draw_rect = kinematic_platforms.draw_rects[self.index]
+
+# --- Checkpoints ---
+class Checkpoints:
+    """Checkpoint rects with a collected bitset and a running count, so progress checks never scan the list"""
+    __slots__ = ("rects", "bits", "count", "links", "linked_count")
+
+    def __init__(self):
+        self.rects = []
+        self.bits = bytearray()  # Bit i set once checkpoint i is collected
+        self.count = 0
+        self.links = []          # Groups of checkpoints that count as collected together
+        self.linked_count = 0    # count when the links were last applied
+
+    def __len__(self):
+        return len(self.rects)
+
+    def add(self, rect):
+        self.rects.append(rect)
+        if len(self.rects) > len(self.bits) * 8:
+            self.bits.append(0)
+        return len(self.rects) - 1
+
+    def link(self, indices):
+        self.links.append(tuple(indices))
+
+    def is_collected(self, index):
+        return self.bits[index >> 3] >> (index & 7) & 1
+
+    def collect(self, index):
+        """Mark a checkpoint collected; returns False if it already was"""
+        if self.is_collected(index):
+            return False
+        self.bits[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+        return True
+
+    def apply_links(self):
+        """Collect the rest of any linked group with a collected member; only rescans after a new collection"""
+        if self.count == self.linked_count:
+            return
+        for group in self.links:
+            if any(self.is_collected(i) for i in group):
+                for i in group:
+                    self.collect(i)
+        self.linked_count = self.count
+
+    def restore(self, bits):
+        self.bits[:] = bits
+        self.count = int.from_bytes(bits, "little").bit_count()
+        self.linked_count = -1  # The snapshot may predate a pending link
+
+    @property
+    def all_collected(self):
+        return self.count == len(self.rects)
+
+    def reset(self):
+        self.bits = bytearray(len(self.bits))
+        self.count = 0
+        self.linked_count = 0
 
 # Global game state
 class GameState:
+    __slots__ = (
+        "player_width", "player_height", "player_pos", "player_pos_reset", "prev_player_pos", "player_velocity",
+        "gravity", "move_speed", "jump_strength", "jump_count", "max_jumps", "deaths", "end",
+        "on_ground", "on_wall_left", "on_wall_right", "on_wall_bottom", "rotation", "prev_rotation", "target_rotation",
+        "camera_offset", "jump_cooldown", "last_jump_time", "sim_ticks", "game_size", "speedrun_start_time",
+        "finish_time", "finish_reached", "death_screen_enable", "speedrun_mode", "game_phase",
+    )
+
     def __init__(self):
         self.player_width, self.player_height = 49, 51
-        self.player_pos = pygame.Vector2(-9425, 979)
-        self.player_pos_reset = pygame.Vector2(-9425, 979)
+        self.player_pos = pygame.Vector2(level["spawn"])
+        self.player_pos_reset = pygame.Vector2(level["spawn"])
+        self.prev_player_pos = pygame.Vector2(level["spawn"])
         self.player_velocity = pygame.Vector2(0, 0)
         self.gravity = 1500
         self.move_speed = 300
@@ -46,13 +189,13 @@ class GameState:
         self.on_wall_right = False
         self.on_wall_bottom = False
         self.rotation = 0
+        self.prev_rotation = 0
         self.target_rotation = 0
-        self.plat_move = 800
-        self.plat_direction = 1
         self.camera_offset = pygame.Vector2(0, 0)
         self.jump_cooldown = 300
-        self.last_jump_time = 0
-        self.game_size = 10000
+        self.last_jump_time = -self.jump_cooldown
+        self.sim_ticks = 0
+        self.game_size = level["size"]
         self.speedrun_start_time = 0
         self.finish_time = 0
         self.finish_reached = False
@@ -60,315 +203,274 @@ class GameState:
         self.speedrun_mode = False
         self.game_phase = "death_screen_prompt"  # Track which screen we're on
 
+# --- Fixed timestep ---
+SIM_HZ = 120
+SIM_DT = 1 / SIM_HZ
+MAX_FRAME_TIME = 0.25  # Longest frame the accumulator will catch up on after a hitch
+
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_JUMP = 4
+INPUT_RESET = 8
+INPUT_REWIND = 16  # Practice only: ignored in speedrun mode
+
+def read_input(keys):
+    inputs = 0
+    if keys[pygame.K_a] or keys[pygame.K_LEFT]:
+        inputs |= INPUT_LEFT
+    if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
+        inputs |= INPUT_RIGHT
+    if keys[pygame.K_SPACE] or keys[pygame.K_w] or keys[pygame.K_UP]:
+        inputs |= INPUT_JUMP
+    if keys[pygame.K_r]:
+        inputs |= INPUT_RESET
+    if keys[pygame.K_q] or keys[pygame.K_BACKSPACE]:
+        inputs |= INPUT_REWIND
+    return inputs
+
+def sim_time_ms():
+    return state.sim_ticks * 1000 // SIM_HZ
+
 # --- Init ---
-pygame.init()
-screen = pygame.display.set_mode((1920, 1200))
 screen_height = 1200
 screen_width = 1920
 clock = pygame.time.Clock()
 
-fps_font = pygame.font.Font(None, 30)
-font = pygame.font.Font(None, 60)
-checkpoint_font = pygame.font.Font(None, 40)
+# --- Text cache ---
+class TextCache:
+    """Rendered text surfaces reused for as long as the same string is drawn in the same font and colour"""
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
 
-state = GameState()
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.surfaces[key] = font.render(text, True, color)
+            while len(self.surfaces) > self.max_entries:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
 
-# --- Finish line ---
-finish_rect = pygame.Rect(9480, 830, 20, 200)
-
-# --- Static Platforms ---
-platforms = [
-    pygame.Rect(20, 800, 100, 50),
-    pygame.Rect(400, 600, 100, 50),
-    pygame.Rect(1600, 100, 100, 50),
-    pygame.Rect(state.plat_move, 300, 100, 50),
-    pygame.Rect(1800, 300, 10, 50),
-    pygame.Rect(2400, 300, 10, 50),
-    pygame.Rect(3000, 300, 10, 50),
-    pygame.Rect(3600, 300, 10, 50),
-    pygame.Rect(4200, 300, 10, 50),
-    pygame.Rect(4800, 300, 10, 50),
-    pygame.Rect(5400, 300, 10, 50),
-    pygame.Rect(6000, 300, 10, 50),
-    pygame.Rect(6600, 300, 10, 50),
-    pygame.Rect(-200, 0, 10, 800),
-    pygame.Rect(-800, 115, 10, 915),
-    pygame.Rect(-7298.5, 998.5, 10, 50),
-    pygame.Rect(-1514, 0, 1325, 10),
-    pygame.Rect(-1514, 0, 10, 800),
-    pygame.Rect(-1492, 538, 40, 10),
-    pygame.Rect(-1070, 896, 40, 10),
-    pygame.Rect(-1330, 722, 40, 10),
-    pygame.Rect(-1080, 276, 40, 10),
-    pygame.Rect(-794, 224, 40, 10),
-    pygame.Rect(-370, 508, 40, 10),
-    pygame.Rect(-782, 630, 40, 10),
-    pygame.Rect(-578, 900, 10, 40),
-    pygame.Rect(-2854, 727, 1241, 10),
-    pygame.Rect(-2854, 727, 10, 188),
-    pygame.Rect(-3100.5, 423.5, 1590, 10),
-    pygame.Rect(-3100.5, 423.5, 10, 550),
-    pygame.Rect(-3005.5, 852.5, 75, 10),
-    pygame.Rect(-4766, 423, 1671, 10),
-    pygame.Rect(-4766, 426.5, 10, 553),
-    pygame.Rect(-6800.5, 700.5, 50, 10),
-    pygame.Rect(-7777, 370, 870, 10),
-    pygame.Rect(8000, 300, 1200, 10),
-    pygame.Rect(8000, 969, 1200, 10),
-]
+class DigitAtlas:
+    """Glyphs for fast-changing numeric fields rendered once, so a new value costs a few small blits"""
+    def __init__(self, font, color, characters="0123456789.:/-+s"):
+        self.color = color
+        self.glyphs = {char: font.render(char, True, color) for char in characters}
 
-# --- Moving Platforms ---
-moving_platforms = [
-    MovingPlatform(-2834.5, 701.5, 50, 20, "y", 450, 700, 100),
-    MovingPlatform(-2500, 400, 50, 20, "y", 450, 700, 60),
-    MovingPlatform(-2182, 618, 50, 20, "y", 450, 700, 40),
-    MovingPlatform(-1633, 618, 50, 20, "y", 450, 700, 100),
-    MovingPlatform(-1998, 618, 50, 20, "y", 450, 700, 150),
-    MovingPlatform(-2311, 618, 50, 20, "y", 450, 700, 90),
-    MovingPlatform(-2647, 618, 50, 20, "y", 450, 700, 60),
-    MovingPlatform(-2844.5, 500.5, 50, 20, "x", -2844.5, -1625.5, 60),
-    MovingPlatform(-2844.5, 700, 50, 20, "x", -2844.5, -1625.5, 90),
-    MovingPlatform(-2844.5, 534, 50, 20, "x", -2844.5, -1625.5, 170),
-    MovingPlatform(-2844.5, 570, 50, 20, "x", -2844.5, -1625.5, 140),
-    MovingPlatform(-2844.5, 810, 50, 20, "x", -2844.5, -1625.5, 80),
-    MovingPlatform(-2844.5, 974, 50, 20, "x", -2844.5, -1625.5, 140),
-    MovingPlatform(7300, 450, 10, 580, "y", 450, 850, 100),
-]
+    def draw(self, surface, text, pos):
+        x, y = pos
+        for char in text:
+            glyph = self.glyphs[char]
+            surface.blit(glyph, (x, y))
+            x += glyph.get_width()
 
-safe_moving_platforms = [
-    MovingPlatform(-8800, 800, 50, 20, "x", -8800, -8400, 100),
-    MovingPlatform(-8300, 452.5, 50, 20, "x", -8300, -7950, 50),
-    MovingPlatform(6700, 650, 50, 20, "x", 6700, 7100, 100),
-    MovingPlatform(7900, 660, 50, 20, "x", 7500, 7900, 100),
-]
+text_cache = TextCache()
 
-# Simplified spike list (just a few for testing)
-spikes = [
-    [(6226, 104), (6201, 147), (6251, 147)],
-    [(6154, 266), (6129, 309), (6179, 309)],
-    [(6409, 319), (6384, 362), (6434, 362)],
-    [(6386, 80), (6361, 123), (6411, 123)],
-    [(6117, -43), (6092, 0), (6142, 0)],
-    [(6247, 549), (6222, 592), (6272, 592)],
-    [(6540, 411), (6515, 454), (6565, 454)],
-    [(6579, 38), (6554, 81), (6604, 81)],
-    [(6416, -20), (6391, 23), (6441, 23)],
-    [(6004, 65), (5979, 108), (6029, 108)],
-    [(6060, 466), (6035, 509), (6085, 509)],
-    [(6198, 3), (6174, 46), (6224, 46)],
-    [(-361, 987), (-386, 1031), (-336, 1031)],
-    [(-503, 987), (-528, 1031), (-478, 1031)],
-    [(-585, 984), (-610, 1028), (-560, 1028)],
-    [(-660, 989), (-685, 1033), (-635, 1033)],
-    [(-731, 984), (-756, 1028), (-706, 1028)],
-    [(-448, 987), (-473, 1031), (-423, 1031)],
-    [(-618, 51), (-644, 94), (-594, 94)],
-    [(-358, 252), (-382, 295), (-332, 295)],
-    [(-624, 397), (-648, 440), (-598, 440)],
-    [(-690, 842), (-716, 885), (-666, 885)],
-    [(92, 743), (68, 786), (118, 786)],
-    [(408, 542), (382, 585), (432, 585)],
-    [(2100, 281), (2076, 324), (2126, 324)],
-    [(2290, 3), (2264, 46), (2314, 46)],
-    [(2704, 93), (2678, 136), (2728, 136)],
-    [(3326, 3), (3302, 46), (3352, 46)],
-    [(3336, 302), (3312, 345), (3362, 345)],
-    [(3924, 293), (3900, 336), (3950, 336)],
-    [(4434, -91), (4410, -48), (4460, -48)],
-    [(4454, 133), (4430, 176), (4480, 176)],
-    [(4988, 306), (4962, 349), (5012, 349)],
-    [(5226, 299), (5200, 342), (5250, 342)],
-    [(5098, 41), (5074, 84), (5124, 84)],
-    [(5666, 290), (5642, 333), (5692, 333)],
-    [(5522, 73), (5498, 116), (5548, 116)],
-    [(5830, 79), (5806, 122), (5856, 122)],
-    [(-9478, 968), (-9504, 1011), (-9454, 1011)],
-    [(-1132, 975), (-1158, 1018), (-1108, 1018)],
-    [(-1470, 698), (-1496, 741), (-1446, 741)],
-    [(-840, 986), (-866, 1029), (-816, 1029)],
-    [(-1312, 805), (-1338, 848), (-1288, 848)],
-    [(-1478, 278), (-1502, 321), (-1452, 321)],
-    [(-1162, 476), (-1186, 519), (-1136, 519)],
-    [(-836, 771), (-862, 814), (-812, 814)],
-    [(-1012, 654), (-1036, 697), (-986, 697)],
-    [(-938, 286), (-962, 329), (-912, 329)],
-    [(-1402, 43), (-1428, 86), (-1378, 86)],
-    [(-1214, 34), (-1238, 77), (-1188, 77)],
-    [(-1054, 24), (-1080, 67), (-1030, 67)],
-    [(-1062, 968), (-1086, 1011), (-1036, 1011)],
-    [(-980, 966), (-1004, 1009), (-954, 1009)],
-    [(-908, 961), (-932, 1004), (-882, 1004)],
-    [(-974, 483), (-998, 526), (-948, 526)],
-    [(-860, 606), (-886, 649), (-836, 649)],
-    [(-858, 411), (-882, 454), (-832, 454)],
-    [(-1080, 344), (-1104, 387), (-1054, 387)],
-    [(-836, 290), (-860, 333), (-810, 333)],
-    [(-1094, 591), (-1120, 634), (-1070, 634)],
-    [(-1390, 762), (-1416, 805), (-1366, 805)],
-    [(-1474, 101), (-1498, 144), (-1448, 144)],
-    [(-1458, 176), (-1484, 219), (-1434, 219)],
-    [(-1476, 606), (-1502, 649), (-1452, 649)],
-    [(-1480, 338), (-1506, 381), (-1456, 381)],
-    [(-766, 353), (-792, 396), (-742, 396)],
-    [(-762, 706), (-788, 749), (-738, 749)],
-    [(-214, 472), (-240, 515), (-190, 515)],
-    [(-218, 756), (-242, 799), (-192, 799)],
-    [(-298, 732), (-324, 775), (-274, 775)],
-    [(-564, 559), (-590, 602), (-540, 602)],
-    [(-494, 548), (-518, 591), (-468, 591)],
-    [(-416, 554), (-440, 597), (-390, 597)],
-    [(-224, 17), (-248, 60), (-198, 60)],
-    [(-330, 567), (-356, 610), (-306, 610)],
-    [(-264, 612), (-288, 655), (-238, 655)],
-    [(-3050, 675), (-3076, 718), (-3026, 718)],
-    [(-2912, 675), (-2936, 718), (-2886, 718)],
-    [(-2984, 526), (-3008, 569), (-2958, 569)],
-    [(-2596, 785), (-2622, 828), (-2572, 828)],
-    [(-2444, 984), (-2468, 1027), (-2418, 1027)],
-    [(-1936, 963), (-1962, 1006), (-1912, 1006)],
-    [(-1730, 778), (-1756, 821), (-1706, 821)],
-    [(-2300, 869), (-2324, 912), (-2274, 912)],
-    [(-2138, 953), (-2162, 996), (-2112, 996)],
-    [(-1590, 869), (-1614, 912), (-1564, 912)],
-    [(-2758, 874), (-2784, 917), (-2734, 917)],
-    [(-2216, 745), (-2242, 788), (-2192, 788)],
-    [(-1866, 959), (-1890, 1002), (-1840, 1002)],
-    [(-2028, 750), (-2054, 793), (-2004, 793)],
-    [(-4602, 440), (-4626, 483), (-4576, 483)],
-    [(-4386, 437), (-4412, 480), (-4362, 480)],
-    [(-4216, 437), (-4242, 480), (-4192, 480)],
-    [(-4294, 436), (-4318, 479), (-4268, 479)],
-    [(-4496, 441), (-4522, 484), (-4472, 484)],
-    [(-4132, 437), (-4158, 480), (-4108, 480)],
-    [(-4070, 436), (-4096, 479), (-4046, 479)],
-    [(-3998, 440), (-4022, 483), (-3972, 483)],
-    [(-3922, 441), (-3946, 484), (-3896, 484)],
-    [(-3830, 444), (-3854, 487), (-3804, 487)],
-    [(-3748, 440), (-3774, 483), (-3724, 483)],
-    [(-3666, 440), (-3692, 483), (-3642, 483)],
-    [(-3594, 437), (-3620, 480), (-3570, 480)],
-    [(-3516, 441), (-3542, 484), (-3492, 484)],
-    [(-3440, 442), (-3466, 485), (-3416, 485)],
-    [(-3368, 437), (-3392, 480), (-3342, 480)],
-    [(-3296, 441), (-3320, 484), (-3270, 484)],
-    [(-3218, 436), (-3244, 479), (-3194, 479)],
-    [(-3150, 438), (-3174, 481), (-3124, 481)],
-    [(-4550, 986), (-4576, 1029), (-4526, 1029)],
-    [(-4608, 986), (-4632, 1029), (-4582, 1029)],
-    [(-4658, 984), (-4684, 1027), (-4634, 1027)],
-    [(-4664, 447), (-4690, 490), (-4640, 490)],
-    [(-4422, 985), (-4446, 1028), (-4396, 1028)],
-    [(-4360, 984), (-4386, 1027), (-4336, 1027)],
-    [(-4306, 983), (-4330, 1026), (-4280, 1026)],
-    [(-4186, 987), (-4212, 1030), (-4162, 1030)],
-    [(-4136, 986), (-4160, 1029), (-4110, 1029)],
-    [(-4084, 984), (-4110, 1027), (-4060, 1027)],
-    [(-3970, 986), (-3994, 1029), (-3944, 1029)],
-    [(-3908, 982), (-3932, 1025), (-3882, 1025)],
-    [(-3854, 985), (-3878, 1028), (-3828, 1028)],
-    [(-3740, 982), (-3766, 1025), (-3716, 1025)],
-    [(-3682, 986), (-3708, 1029), (-3658, 1029)],
-    [(-3628, 989), (-3652, 1032), (-3602, 1032)],
-    [(-3522, 983), (-3546, 1026), (-3496, 1026)],
-    [(-3470, 982), (-3494, 1025), (-3444, 1025)],
-    [(-3420, 982), (-3446, 1025), (-3396, 1025)],
-    [(-3314, 985), (-3338, 1028), (-3288, 1028)],
-    [(-3262, 984), (-3288, 1027), (-3238, 1027)],
-    [(-3208, 983), (-3234, 1026), (-3184, 1026)],
-    [(-6208, 511), (-6234, 554), (-6184, 554)],
-    [(-6192, 551), (-6216, 594), (-6166, 594)],
-    [(-6160, 592), (-6184, 635), (-6134, 635)],
-    [(-6136, 639), (-6162, 682), (-6112, 682)],
-    [(-6114, 686), (-6140, 729), (-6090, 729)],
-    [(-6090, 729), (-6114, 772), (-6064, 772)],
-    [(-6074, 776), (-6100, 819), (-6050, 819)],
-    [(-6056, 818), (-6082, 861), (-6032, 861)],
-    [(-6044, 866), (-6068, 909), (-6018, 909)],
-    [(-6024, 914), (-6050, 957), (-6000, 957)],
-    [(-6004, 954), (-6030, 997), (-5980, 997)],
-    [(-5984, 996), (-6010, 1039), (-5960, 1039)],
-    [(-8530, 698), (-8554, 741), (-8504, 741)],
-    [(-8118, 568), (-8142, 611), (-8092, 611)],
-    [(-8406, 542), (-8430, 585), (-8380, 585)],
-    [(-8198, 574), (-8224, 617), (-8174, 617)],
-    [(-8602, 704), (-8628, 747), (-8578, 747)],
-    [(-5048, 704), (-5074, 747), (-5024, 747)],
-    [(-5148, 803), (-5172, 846), (-5122, 846)],
-    [(-5226, 927), (-5252, 970), (-5202, 970)],
-    [(-4946, 773), (-4972, 816), (-4922, 816)],
-    [(-4790, 377), (-4816, 420), (-4766, 420)],
-    [(-4850, 323), (-4876, 366), (-4826, 366)],
-    [(-4916, 266), (-4940, 309), (-4890, 309)],
-    [(-4974, 222), (-5000, 265), (-4950, 265)],
-    [(-9308, 962), (-9334, 1005), (-9284, 1005)],
-    [(-9260, 917), (-9286, 960), (-9236, 960)],
-    [(-9208, 866), (-9234, 909), (-9184, 909)],
-    [(-9164, 809), (-9190, 852), (-9140, 852)],
-    [(-9116, 753), (-9142, 796), (-9092, 796)],
-    [(-9052, 722), (-9076, 765), (-9026, 765)],
-    [(-8996, 762), (-9020, 805), (-8970, 805)],
-    [(-8946, 819), (-8972, 862), (-8922, 862)],
-    [(-8918, 894), (-8942, 937), (-8892, 937)],
-    [(-8876, 967), (-8902, 1010), (-8852, 1010)],
-    [(7236, 401), (7210, 444), (7260, 444)],
-    [(7368, 396), (7342, 439), (7392, 439)],
-    [(7140, 256), (7116, 299), (7166, 299)],
-    [(7454, 249), (7428, 292), (7478, 292)],
-    [(7302, 402), (7278, 445), (7328, 445)],
-    [(8018, 914), (7994, 957), (8044, 957)],
-    [(8068, 884), (8042, 927), (8092, 927)],
-    [(8102, 835), (8076, 878), (8126, 878)],
-    [(8154, 811), (8130, 854), (8180, 854)],
-    [(8194, 792), (8170, 835), (8220, 835)],
-    [(8238, 764), (8214, 807), (8264, 807)],
-    [(8314, 739), (8288, 782), (8338, 782)],
-    [(8364, 727), (8338, 770), (8388, 770)],
-    [(8420, 691), (8396, 734), (8446, 734)],
-    [(8484, 720), (8458, 763), (8508, 763)],
-    [(8504, 765), (8480, 808), (8530, 808)],
-    [(8536, 797), (8512, 840), (8562, 840)],
-    [(8570, 841), (8546, 884), (8596, 884)],
-    [(8596, 885), (8570, 928), (8620, 928)],
-    [(8618, 924), (8594, 967), (8644, 967)],
-    [(8030, 313), (8006, 356), (8056, 356)],
-    [(8078, 354), (8052, 397), (8102, 397)],
-    [(8130, 394), (8106, 437), (8156, 437)],
-    [(8194, 433), (8168, 476), (8218, 476)],
-    [(8258, 466), (8234, 509), (8284, 509)],
-    [(8334, 493), (8310, 536), (8360, 536)],
-    [(8390, 486), (8366, 529), (8416, 529)],
-    [(8426, 469), (8400, 512), (8450, 512)],
-    [(8466, 432), (8442, 475), (8492, 475)],
-    [(8484, 419), (8458, 462), (8508, 462)],
-    [(8496, 409), (8472, 452), (8522, 452)],
-    [(8518, 391), (8492, 434), (8542, 434)],
-    [(8562, 342), (8536, 385), (8586, 385)],
-    [(8604, 319), (8580, 362), (8630, 362)],
-    [(8664, 348), (8640, 391), (8690, 391)],
-    [(8702, 411), (8676, 454), (8726, 454)],
-    [(8712, 436), (8688, 479), (8738, 479)],
-    [(8750, 477), (8726, 520), (8776, 520)],
-    [(8788, 524), (8764, 567), (8814, 567)],
-    [(8834, 568), (8808, 611), (8858, 611)],
-    [(8886, 602), (8862, 645), (8912, 645)],
-    [(8968, 595), (8944, 638), (8994, 638)],
-    [(9018, 570), (8994, 613), (9044, 613)],
-    [(9044, 549), (9020, 592), (9070, 592)],
-    [(9104, 473), (9080, 516), (9130, 516)],
-    [(9120, 446), (9096, 489), (9146, 489)],
-    [(9166, 387), (9140, 430), (9190, 430)],
-    [(9186, 356), (9160, 399), (9210, 399)],
-    [(9194, 327), (9168, 370), (9218, 370)],
-    [(8684, 932), (8660, 975), (8710, 975)],
-    [(8760, 933), (8736, 976), (8786, 976)],
-    [(8836, 931), (8812, 974), (8862, 974)],
-    [(8948, 929), (8922, 972), (8972, 972)],
-    [(9008, 927), (8984, 970), (9034, 970)],
-    [(9070, 931), (9044, 974), (9094, 974)],
-    [(9120, 929), (9096, 972), (9146, 972)],
-    [(9176, 924), (9150, 967), (9200, 967)],
-    [(8896, 927), (8870, 970), (8920, 970)],
-]
+def draw_hud_field(surface, font, atlas, label, value, pos):
+    """A cached label followed by a number drawn from the digit atlas"""
+    label_surface = text_cache.render(font, label, atlas.color)
+    surface.blit(label_surface, pos)
+    atlas.draw(surface, value, (pos[0] + label_surface.get_width(), pos[1]))
+
+# The window and fonts are only created by init_display, so the simulation can run headless
+screen = None
+fps_font = font = checkpoint_font = None
+hud_digits = fps_digits = ahead_digits = behind_digits = None
+headless = False
+
+def init_display():
+    global screen, fps_font, font, checkpoint_font, hud_digits, fps_digits, ahead_digits, behind_digits
+    pygame.init()
+    screen = pygame.display.set_mode((screen_width, screen_height))
+    fps_font = pygame.font.Font(None, 30)
+    font = pygame.font.Font(None, 60)
+    checkpoint_font = pygame.font.Font(None, 40)
+    hud_digits = DigitAtlas(checkpoint_font, (255, 255, 0))
+    fps_digits = DigitAtlas(fps_font, (255, 255, 0))
+    ahead_digits = DigitAtlas(checkpoint_font, (0, 220, 0))
+    behind_digits = DigitAtlas(checkpoint_font, (255, 60, 60))
+
+def log(message):
+    if not headless:
+        print(message)
+
+# --- Level files ---
+# A level is a plain dict. JSON (.json) is the authoring form; the packed binary form (.lvl) is what ships.
+LEVEL_VERSION = 1
+LEVEL_MAGIC = b"PLVL"
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels")
+DEFAULT_LEVEL = os.path.join(LEVEL_DIR, "level1.lvl")
+
+LEVEL_HEADER = struct.Struct("<4sHddii4i")  # magic, version, spawn x/y, size, ground_y, finish rect
+LEVEL_COUNT = struct.Struct("<I")
+LEVEL_RECORDS = {
+    "platforms": struct.Struct("<4i"),
+    "moving_platforms": struct.Struct("<4dB3d"),  # x, y, width, height, axis (0 = x), min, max, speed
+    "safe_moving_platforms": struct.Struct("<4dB3d"),
+    "spikes": struct.Struct("<6i"),
+    "checkpoints": struct.Struct("<4i"),
+    "reset_zones": struct.Struct("<4d"),
+    "physics_zones": struct.Struct("<4ddi"),  # area, gravity, max_jumps
+}
+
+def area_bounds(area):
+    """[min_x, min_y, max_x, max_y] with null for unbounded sides, as inclusive float bounds"""
+    low, high = float("-inf"), float("inf")
+    return tuple((low if i < 2 else high) if v is None else float(v) for i, v in enumerate(area))
+
+def json_area(bounds):
+    return [None if math.isinf(v) else int(v) if v.is_integer() else v for v in bounds]
+
+def check_level_version(version):
+    if version != LEVEL_VERSION:
+        raise ValueError(f"Unsupported level version {version} (expected {LEVEL_VERSION})")
+
+def int_values(values):
+    """Integer coordinates truncated toward zero, as pygame.Rect stores them; levels may be written with floats"""
+    return tuple(int(v) for v in values)
+
+def level_from_json(data):
+    check_level_version(data.get("version"))
+    return {
+        "version": LEVEL_VERSION,
+        "spawn": tuple(data["spawn"]),
+        "size": int(data["size"]),
+        "ground_y": int(data["ground_y"]),
+        "finish": int_values(data["finish"]),
+        "platforms": [int_values(rect) for rect in data["platforms"]],
+        "moving_platforms": [tuple(mp) for mp in data["moving_platforms"]],
+        "safe_moving_platforms": [tuple(mp) for mp in data["safe_moving_platforms"]],
+        "spikes": [int_values(spike) for spike in data["spikes"]],
+        "checkpoints": [int_values(rect) for rect in data["checkpoints"]],
+        "linked_checkpoints": [tuple(group) for group in data.get("linked_checkpoints", [])],
+        "reset_zones": [area_bounds(area) for area in data.get("reset_zones", [])],
+        "physics_zones": [(area_bounds(zone["area"]), zone["gravity"], zone["max_jumps"])
+                          for zone in data.get("physics_zones", [])],
+    }
+
+def level_to_json(level):
+    data = dict(level)
+    data["reset_zones"] = [json_area(area) for area in level["reset_zones"]]
+    data["physics_zones"] = [{"area": json_area(area), "gravity": gravity, "max_jumps": max_jumps}
+                             for area, gravity, max_jumps in level["physics_zones"]]
+    return data
+
+def level_to_bytes(level):
+    parts = [LEVEL_HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION, *level["spawn"], level["size"], level["ground_y"], *level["finish"])]
+    for key, record in LEVEL_RECORDS.items():
+        parts.append(LEVEL_COUNT.pack(len(level[key])))
+        for item in level[key]:
+            if key in ("moving_platforms", "safe_moving_platforms"):
+                item = item[:4] + (0 if item[4] == "x" else 1,) + item[5:]
+            elif key == "physics_zones":
+                item = item[0] + item[1:]
+            parts.append(record.pack(*item))
+    parts.append(LEVEL_COUNT.pack(len(level["linked_checkpoints"])))
+    for group in level["linked_checkpoints"]:
+        parts.append(struct.pack(f"<I{len(group)}I", len(group), *group))
+    return b"".join(parts)
+
+def level_from_bytes(data):
+    magic, version, spawn_x, spawn_y, size, ground_y, *finish = LEVEL_HEADER.unpack_from(data)
+    if magic != LEVEL_MAGIC:
+        raise ValueError("Not a packed level file")
+    check_level_version(version)
+    level = {
+        "version": version,
+        "spawn": (spawn_x, spawn_y),
+        "size": size,
+        "ground_y": ground_y,
+        "finish": tuple(finish),
+    }
+    offset = LEVEL_HEADER.size
+    for key, record in LEVEL_RECORDS.items():
+        (count,) = LEVEL_COUNT.unpack_from(data, offset)
+        offset += LEVEL_COUNT.size
+        end = offset + count * record.size
+        items = list(record.iter_unpack(data[offset:end]))
+        offset = end
+        if key in ("moving_platforms", "safe_moving_platforms"):
+            items = [item[:4] + ("x" if item[4] == 0 else "y",) + item[5:] for item in items]
+        elif key == "physics_zones":
+            items = [(item[:4], item[4], item[5]) for item in items]
+        level[key] = items
+    (count,) = LEVEL_COUNT.unpack_from(data, offset)
+    offset += LEVEL_COUNT.size
+    groups = []
+    for _ in range(count):
+        (length,) = LEVEL_COUNT.unpack_from(data, offset)
+        groups.append(struct.unpack_from(f"<{length}I", data, offset + LEVEL_COUNT.size))
+        offset += LEVEL_COUNT.size * (length + 1)
+    level["linked_checkpoints"] = groups
+    return level
+
+def read_level_file(path):
+    """Load a level from a .json or packed .lvl file, with its digest
+
+    A .lvl file is exactly the bytes level_digest hashes, so only JSON levels are re-packed to hash them.
+    """
+    if path.endswith(".json"):
+        with open(path) as f:
+            level = level_from_json(json.load(f))
+        return level, level_digest(level)
+    with open(path, "rb") as f:
+        data = f.read()
+    return level_from_bytes(data), hashlib.sha256(data).digest()
+
+def read_level(path):
+    """Load a level from a .json or packed .lvl file"""
+    return read_level_file(path)[0]
+
+def level_json_text(level):
+    """JSON with one object per line, so level files diff cleanly"""
+    lines = []
+    for key, value in level_to_json(level).items():
+        if isinstance(value, list) and value and isinstance(value[0], (list, tuple, dict)):
+            items = ",\n".join("    " + json.dumps(item) for item in value)
+            lines.append(f"  {json.dumps(key)}: [\n{items}\n  ]")
+        else:
+            lines.append(f"  {json.dumps(key)}: {json.dumps(value)}")
+    return "{\n" + ",\n".join(lines) + "\n}\n"
+
+def write_atomic(path, data):
+    """Replace path with data atomically, so a reader (or the next launch, after a crash) never sees it half written"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def write_level(level, path):
+    if path.endswith(".json"):
+        write_atomic(path, level_json_text(level).encode())
+    else:
+        write_atomic(path, level_to_bytes(level))
+
+def build_level_objects(level):
+    """Finish line, moving platforms and checkpoints for a level; replaces any previous level's moving platforms"""
+    kinematic_platforms.clear()
+    finish = pygame.Rect(level["finish"])
+    hazards = [MovingPlatform(*mp) for mp in level["moving_platforms"]]
+    safe = [MovingPlatform(*mp) for mp in level["safe_moving_platforms"]]
+    store = Checkpoints()
+    for rect in level["checkpoints"]:
+        store.add(pygame.Rect(rect))
+    for group in level["linked_checkpoints"]:
+        store.link(group)
+    return finish, hazards, safe, store
+
+def in_area(bounds, x, y):
+    return bounds[0] <= x <= bounds[2] and bounds[1] <= y <= bounds[3]
+
+level, default_digest = read_level_file(DEFAULT_LEVEL)
+state = GameState()
 
 class Button:
     def __init__(self, x, y, width, height, text, color, hover_color):
@@ -379,60 +481,118 @@ class Button:
         self.text_surface = font.render(text, True, (0, 0, 0))
         self.text_rect = self.text_surface.get_rect(center=self.rect.center)
 
+    def is_hovered(self, mouse_pos):
+        return self.rect.collidepoint(mouse_pos)
+
     def draw(self, screen):
-        mouse_pos = pygame.mouse.get_pos()
-        current_color = self.hover_color if self.rect.collidepoint(mouse_pos) else self.color
+        current_color = self.hover_color if self.is_hovered(pygame.mouse.get_pos()) else self.color
         pygame.draw.rect(screen, current_color, self.rect)
         screen.blit(self.text_surface, self.text_rect)
 
     def is_clicked(self, event):
         return event.type == pygame.MOUSEBUTTONDOWN and self.rect.collidepoint(event.pos)
 
-# --- Checkpoints ---
-checkpoints = [
-    {"rect": pygame.Rect(-2420.0, 672.0, 49, 51), "collected": False},
-    {"rect": pygame.Rect(-2318, 964, 49, 51), "collected": False},
-    {"rect": pygame.Rect(-1494, 979, 49, 51), "collected": False},
-    {"rect": pygame.Rect(1631, 40, 49, 51), "collected": False},
-    {"rect": pygame.Rect(4179, 249, 49, 51), "collected": False},
-    {"rect": pygame.Rect(5968, 249, 49, 51), "collected": False},
-    {"rect": pygame.Rect(6570, 249, 49, 51), "collected": False},
-    {"rect": pygame.Rect(-376, 456, 49, 51), "collected": False},
-    {"rect": pygame.Rect(-3000, 979, 49, 51), "collected": False},
-    {"rect": pygame.Rect(-4050, 979, 49, 51), "collected": False},
-    {"rect": pygame.Rect(-4840, 979, 49, 51), "collected": False},
-    {"rect": pygame.Rect(-7360, 315, 49, 51), "collected": False},
-    {"rect": pygame.Rect(7928, 972, 49, 51), "collected": False},
-]
-
 # --- Precompute spike masks ---
-precomputed_spikes = []
-for spike in spikes:
-    min_x = min(p[0] for p in spike)
-    min_y = min(p[1] for p in spike)
-    max_x = max(p[0] for p in spike)
-    max_y = max(p[1] for p in spike)
-    width = max(max_x - min_x, 1)
-    height = max(max_y - min_y, 1)
-    shifted_spike = [(int(x - min_x), int(y - min_y)) for x, y in spike]
-    triangle_surface = pygame.Surface((width, height), pygame.SRCALPHA)
-    pygame.draw.polygon(triangle_surface, (255, 0, 0), shifted_spike)
-    triangle_mask = pygame.mask.from_surface(triangle_surface)
-    precomputed_spikes.append({
-        "mask": triangle_mask,
-        "offset": (min_x, min_y),
-        "rect": pygame.Rect(min_x, min_y, width, height)
-    })
+def triangle_axes(points):
+    """Edge normals of a triangle with the triangle's projected interval on each"""
+    axes = []
+    for i in range(3):
+        (x0, y0), (x1, y1), (x2, y2) = points[i], points[(i + 1) % 3], points[(i + 2) % 3]
+        nx, ny = y1 - y0, x0 - x1
+        edge = nx * x0 + ny * y0
+        apex = nx * x2 + ny * y2
+        axes.append((nx, ny, min(edge, apex), max(edge, apex)))
+    return tuple(axes)
+
+spike_shapes = {}
+
+def intern_spike_shape(points):
+    """Shared sprite, mask and SAT axes for a triangle, keyed by its vertices relative to its bounding box"""
+    key = tuple(sorted(points))
+    shape = spike_shapes.get(key)
+    if shape is None:
+        width = max(max(x for x, _ in key), 1)
+        height = max(max(y for _, y in key), 1)
+        # One extra pixel so the sprite keeps the right and bottom edges draw.polygon would fill
+        surface = pygame.Surface((width + 1, height + 1), pygame.SRCALPHA)
+        pygame.draw.polygon(surface, (255, 0, 0), key)
+        shape = spike_shapes[key] = {
+            "key": key,
+            "surface": surface,
+            "mask": pygame.mask.from_surface(surface),
+            "axes": triangle_axes(key),
+            "size": (width, height),
+        }
+    return shape
+
+class Spike:
+    """One placed spike: a shared shape at an offset, with its bounding rect"""
+    __slots__ = ("shape", "offset", "rect")
+
+    def __init__(self, shape, offset):
+        self.shape = shape
+        self.offset = offset
+        self.rect = pygame.Rect(offset, shape["size"])
+
+def precompute_spikes(spikes):
+    precomputed = []
+    for spike in spikes:
+        min_x = int(min(p[0] for p in spike))
+        min_y = int(min(p[1] for p in spike))
+        shape = intern_spike_shape([(int(x) - min_x, int(y) - min_y) for x, y in spike])
+        precomputed.append(Spike(shape, (min_x, min_y)))
+    return precomputed
+
+# --- Spike index ---
+class SpikeIndex:
+    """Spikes sorted by left edge, so a query bisects to the x window around a rect"""
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=lambda spike: spike.rect.left)
+        self.lefts = [spike.rect.left for spike in self.entries]
+        self.max_width = max((spike.rect.width for spike in self.entries), default=0)
+
+    def query(self, rect):
+        start = bisect_right(self.lefts, rect.left - self.max_width)
+        end = bisect_left(self.lefts, rect.right)
+        for spike in self.entries[start:end]:
+            if rect.colliderect(spike.rect):
+                yield spike
+
+def triangle_hits_rect(axes, rect, offset):
+    """Separating-axis test of a triangle placed at offset against rect; the x/y axes are covered by the bounding-box check"""
+    half_w = rect.width / 2
+    half_h = rect.height / 2
+    center_x = rect.x + half_w - offset[0]
+    center_y = rect.y + half_h - offset[1]
+    for nx, ny, low, high in axes:
+        center = nx * center_x + ny * center_y
+        extent = abs(nx) * half_w + abs(ny) * half_h
+        if center + extent <= low or center - extent >= high:
+            return False
+    return True
+
+# Test spikes against their rasterised masks instead, reporting any disagreement with triangle_hits_rect
+spike_mask_check = False
+player_masks = {}
+
+def spike_mask_hits_rect(spike, rect):
+    player_mask = player_masks.get(rect.size)
+    if player_mask is None:
+        player_mask = player_masks[rect.size] = pygame.mask.Mask(rect.size, fill=True)
+    offset = (int(rect.x - spike.offset[0]), int(rect.y - spike.offset[1]))
+    hit = spike.shape["mask"].overlap(player_mask, offset) is not None
+    if hit != triangle_hits_rect(spike.shape["axes"], rect, spike.offset):
+        print(f"Spike test mismatch at {rect}: mask={hit}")
+    return hit
 
 def check_collision_with_spikes(player_rect):
-    player_surface = pygame.Surface((player_rect.width, player_rect.height), pygame.SRCALPHA)
-    pygame.draw.rect(player_surface, (255, 255, 255), (0, 0, player_rect.width, player_rect.height))
-    player_mask = pygame.mask.from_surface(player_surface)
-    for spike in precomputed_spikes:
-        if player_rect.colliderect(spike["rect"]):
-            offset = (int(player_rect.x - spike["offset"][0]), int(player_rect.y - spike["offset"][1]))
-            if spike["mask"].overlap(player_mask, offset):
-                return True
+    for spike in spike_index.query(player_rect):
+        if spike_mask_check:
+            hit = spike_mask_hits_rect(spike, player_rect)
+        else:
+            hit = triangle_hits_rect(spike.shape["axes"], player_rect, spike.offset)
+        if hit:
+            return True
     return False
 
 def player_deaths():
@@ -440,89 +600,1972 @@ def player_deaths():
 
 def player_reset():
     """Reset player to checkpoint position"""
-    print(f"Player Died at: {state.player_pos}")
+    log(f"Player Died at: {state.player_pos}")
     state.player_velocity.update(0, 0)
     state.rotation = 0
     state.target_rotation = 0
     state.player_pos.update(state.player_pos_reset.x, state.player_pos_reset.y)
+    # Snap instead of interpolating across the respawn
+    state.prev_player_pos.update(state.player_pos)
+    state.prev_rotation = 0
     state.jump_count = 0
     player_deaths()
 
-ground_y = 1030
-ground_rects = [pygame.Rect(x, ground_y, 200, 50) for x in range(-state.game_size, state.game_size, 200)]
 wall_height = 2000
-left_wall = pygame.Rect(-state.game_size, ground_y - wall_height, 500, wall_height)
-right_wall = pygame.Rect(state.game_size - 500, ground_y - wall_height, 500, wall_height)
-
-def resolve_collisions(rect, static_platforms, safe_moving_platforms, dt):
-    all_platform_rects = []
-    all_platform_rects.extend([p.rect for p in safe_moving_platforms if hasattr(p, 'rect')])
-    all_platform_rects.extend([p.rect for p in static_platforms if hasattr(p, 'rect')])
-    all_platform_rects.extend([p for p in safe_moving_platforms if isinstance(p, pygame.Rect)])
-    all_platform_rects.extend([p for p in static_platforms if isinstance(p, pygame.Rect)])
-    all_platform_rects.extend(ground_rects)
-    all_platform_rects.append(left_wall)
-    all_platform_rects.append(right_wall)
 
+def build_bounds(level):
+    """Ground strip and side walls spanning the level's width"""
+    size, top = level["size"], level["ground_y"]
+    ground = [pygame.Rect(x, top, 200, 50) for x in range(-size, size, 200)]
+    left = pygame.Rect(-size, top - wall_height, 500, wall_height)
+    right = pygame.Rect(size - 500, top - wall_height, 500, wall_height)
+    return ground, left, right
+
+
+# --- Collider compaction ---
+def merge_runs(items, horizontal):
+    """Merge rects sharing a row (or column) span that touch or overlap along it"""
+    groups = {}
+    for order, rect in items:
+        key = (rect.y, rect.height) if horizontal else (rect.x, rect.width)
+        groups.setdefault(key, []).append((order, rect))
+    merged = []
+    for group in groups.values():
+        group.sort(key=lambda item: item[1].x if horizontal else item[1].y)
+        cur_order, cur = group[0]
+        for order, rect in group[1:]:
+            touching = rect.left <= cur.right if horizontal else rect.top <= cur.bottom
+            if touching:
+                cur = cur.union(rect)
+                cur_order = min(cur_order, order)
+            else:
+                merged.append((cur_order, cur))
+                cur_order, cur = order, rect
+        merged.append((cur_order, cur))
+    return merged
+
+def compact_rects(rects):
+    """Merge collinear, touching rects into maximal rects"""
+    items = list(enumerate(rects))
+    count = None
+    while count != len(items):
+        count = len(items)
+        items = merge_runs(merge_runs(items, True), False)
+    return [r for _, r in sorted(items, key=lambda item: item[0])]
+
+# --- Static collision grid ---
+class SpatialGrid:
+    def __init__(self, cell_size=256):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.rects = []
+        self.items = []
+        self.min_width = self.min_height = float("inf")
+
+    def cell_range(self, rect):
+        size = self.cell_size
+        return rect.left // size, (rect.right - 1) // size, rect.top // size, (rect.bottom - 1) // size
+
+    def insert(self, rect, item=None):
+        """File rect under the cells it overlaps, with an optional payload for callers that need more than the rect"""
+        index = len(self.rects)
+        self.rects.append(rect)
+        self.items.append(rect if item is None else item)
+        self.min_width = min(self.min_width, rect.width)
+        self.min_height = min(self.min_height, rect.height)
+        x0, x1, y0, y1 = self.cell_range(rect)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                self.cells.setdefault((cx, cy), []).append(index)
+        return index
+
+    def query(self, rect):
+        """Indices of every rect filed in a cell rect overlaps, in insertion order"""
+        x0, x1, y0, y1 = self.cell_range(rect)
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell:
+                    found.update(cell)
+        return sorted(found)
+
+def build_static_grid(colliders):
+    grid = SpatialGrid()
+    for rect in colliders:
+        grid.insert(rect)
+    return grid
+
+def push_y(rect, plat_rect):
+    if state.player_velocity.y > 0:
+        rect.bottom = plat_rect.top
+        state.player_velocity.y = 0
+        state.on_ground = True
+    elif state.player_velocity.y < 0:
+        rect.top = plat_rect.bottom
+        state.player_velocity.y = 0
+        state.on_wall_bottom = True
+    if state.on_ground:
+        state.jump_count = 0
+
+def push_x(rect, plat_rect):
+    if state.player_velocity.x > 0:
+        rect.right = plat_rect.left
+        state.player_velocity.x = 0
+        state.on_wall_right = True
+    elif state.player_velocity.x < 0:
+        rect.left = plat_rect.right
+        state.player_velocity.x = 0
+        state.on_wall_left = True
+    if state.on_wall_left or state.on_wall_right:
+        state.jump_count = 0
+
+def collide_y(rect, plat_rect):
+    if not rect.colliderect(plat_rect):
+        return False
+    old_y = rect.y
+    push_y(rect, plat_rect)
+    return rect.y != old_y
+
+def collide_x(rect, plat_rect):
+    if not rect.colliderect(plat_rect):
+        return False
+    old_x = rect.x
+    push_x(rect, plat_rect)
+    return rect.x != old_x
+
+def resolve_axis(rect, grid, moving_platforms, collide):
+    pushed = False
+    for mp in moving_platforms:
+        pushed = collide(rect, mp.rect) or pushed
+    candidates = grid.query(rect)
+    i = 0
+    while i < len(candidates):
+        index = candidates[i]
+        i += 1
+        if collide(rect, grid.rects[index]):
+            pushed = True
+            # A push can carry rect into cells the first query didn't cover
+            candidates = [j for j in grid.query(rect) if j > index]
+            i = 0
+    return pushed
+
+# Sweep the player's leading edge along each axis move so a fast tick can't carry it past a thin collider
+swept_collisions = True
+
+def sweep_hit(rect, moved, grid, moving_platforms, vertical):
+    """Nearest collider whose facing edge rect's leading edge crosses on the way to moved, or None"""
+    candidates = [mp.rect for mp in moving_platforms]
+    candidates.extend(grid.rects[i] for i in grid.query(rect.union(moved)))
+    hit = None
+    if vertical:
+        for plat in candidates:
+            if plat.right <= rect.left or plat.left >= rect.right:
+                continue
+            if moved.y > rect.y and rect.bottom <= plat.top < moved.bottom:
+                if hit is None or plat.top < hit.top:
+                    hit = plat
+            elif moved.y < rect.y and moved.top < plat.bottom <= rect.top:
+                if hit is None or plat.bottom > hit.bottom:
+                    hit = plat
+    else:
+        for plat in candidates:
+            if plat.bottom <= rect.top or plat.top >= rect.bottom:
+                continue
+            if moved.x > rect.x and rect.right <= plat.left < moved.right:
+                if hit is None or plat.left < hit.left:
+                    hit = plat
+            elif moved.x < rect.x and moved.left < plat.right <= rect.left:
+                if hit is None or plat.right > hit.right:
+                    hit = plat
+    return hit
+
+def move_axis(rect, grid, moving_platforms, vertical):
+    """Move rect to the player's new position on one axis and resolve; returns True if a collider stopped it"""
+    moved = rect.copy()
+    if vertical:
+        moved.y = state.player_pos.y
+    else:
+        moved.x = state.player_pos.x
+    hit = None
+    if swept_collisions:
+        # A move no longer than the thinnest collider still ends overlapping anything it crossed
+        distance = abs(moved.y - rect.y) if vertical else abs(moved.x - rect.x)
+        thinnest = grid.min_height if vertical else grid.min_width
+        for mp in moving_platforms:
+            thinnest = min(thinnest, mp.rect.height if vertical else mp.rect.width)
+        if distance > thinnest:
+            hit = sweep_hit(rect, moved, grid, moving_platforms, vertical)
+    if hit is not None:
+        # Stop at the first collider's edge; anything still overlapping is left to the discrete pass
+        if vertical:
+            push_y(rect, hit)
+        else:
+            push_x(rect, hit)
+    else:
+        rect.topleft = moved.topleft
+    pushed = resolve_axis(rect, grid, moving_platforms, collide_y if vertical else collide_x)
+    return hit is not None or pushed
+
+def resolve_collisions(rect, grid, safe_moving_platforms, dt):
     state.on_ground = False
     state.on_wall_left = False
     state.on_wall_right = False
     state.on_wall_bottom = False
 
-    rect.y += state.player_velocity.y * dt
-
-    for plat_rect in all_platform_rects:
-        if rect.colliderect(plat_rect):
-            if state.player_velocity.y > 0:
-                rect.bottom = plat_rect.top
-                state.player_velocity.y = 0
-                state.on_ground = True
-            elif state.player_velocity.y < 0:
-                rect.top = plat_rect.bottom
-                state.player_velocity.y = 0
-                state.on_wall_bottom = True
-            if state.on_ground:
-                state.jump_count = 0
-    
-    state.player_pos.y = rect.y
+    # Positions keep their sub-pixel remainder unless a collision snaps the rect to an edge
+    state.player_pos.y += state.player_velocity.y * dt
+    if move_axis(rect, grid, safe_moving_platforms, True):
+        state.player_pos.y = rect.y
+
+    state.player_pos.x += state.player_velocity.x * dt
+    if move_axis(rect, grid, safe_moving_platforms, False):
+        state.player_pos.x = rect.x
+
+# --- View culling ---
+# Static geometry is drawn straight from the streamed collision grid, coloured by LevelStream.kind
+STATIC_COLORS = ((255, 255, 255), (100, 100, 255), (0, 255, 0))  # Ground, walls, platforms
+
+def build_draw_grids():
+    """Grids of moving platforms by their travel area, and of checkpoints"""
+    moving = SpatialGrid()
+    for mp in moving_platforms:
+        moving.insert(kinematic_platforms.travel_rect(mp.index), (mp, (255, 0, 0)))
+    for mp in safe_moving_platforms:
+        moving.insert(kinematic_platforms.travel_rect(mp.index), (mp, (0, 255, 0)))
+
+    # Indices match the checkpoint store, so a query yields checkpoint numbers in level order
+    grid = SpatialGrid()
+    for rect in checkpoints.rects:
+        grid.insert(rect)
+    return moving, grid
+
+# --- Static tile cache ---
+class StaticTileCache:
+    """Ground, walls, platforms and spikes rasterised once into world-aligned tiles per render scale; least recently used tiles are evicted"""
+    def __init__(self, tile_size=512, max_tiles=32):
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.tiles = OrderedDict()
+
+    def render_tile(self, key):
+        """Rasterise one tile, or None if nothing static touches it"""
+        size = self.tile_size
+        scale = key[2]
+        area = pygame.Rect(key[0] * size, key[1] * size, size, size)
+        statics = sorted(static_grid.query(area), key=lambda index: (level_stream.kind(index), index))
+        # Spike sprites run one pixel past their bounding rect
+        spikes = list(spike_index.query(area.inflate(2, 2)))
+        if not statics and not spikes:
+            return None
+        tile = pygame.Surface((size, size))
+        if pygame.display.get_surface() is not None:
+            tile = tile.convert()
+        tile.fill((0, 0, 0))
+        for index in statics:
+            color = STATIC_COLORS[level_stream.kind(index)]
+            pygame.draw.rect(tile, color, static_grid.rects[index].move(-area.x, -area.y))
+        for spike in spikes:
+            x, y = spike.offset
+            tile.blit(spike.shape["surface"], (x - area.x, y - area.y))
+        if scale != 1:
+            # Nearest-neighbour keeps the black background exact for the colorkey below
+            tile = pygame.transform.scale(tile, (round(size * scale), round(size * scale)))
+        # Most of a tile is empty background; RLE colorkey blits skip those runs entirely
+        tile.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+        return tile
+
+    def get(self, key):
+        if key not in self.tiles:
+            tile = self.tiles[key] = self.render_tile(key)
+            while len(self.tiles) > self.max_tiles:
+                self.tiles.popitem(last=False)
+        else:
+            tile = self.tiles[key]
+            self.tiles.move_to_end(key)
+        return tile
+
+    def invalidate(self, rect=None):
+        """Drop the tiles overlapping rect (every tile if rect is None) so they are re-rendered on next use"""
+        if rect is None:
+            self.tiles.clear()
+            return
+        size = self.tile_size
+        for key in [key for key in self.tiles if rect.colliderect((key[0] * size, key[1] * size, size, size))]:
+            del self.tiles[key]
+
+    def queue(self, batch, view, scale=1):
+        """Queue the non-empty tiles overlapping view, drawn at scale, onto a DrawBatch"""
+        size = self.tile_size
+        scaled_size = round(size * scale)
+        origin_x, origin_y = round(view.x * scale), round(view.y * scale)
+        for ty in range(view.top // size, (view.bottom - 1) // size + 1):
+            for tx in range(view.left // size, (view.right - 1) // size + 1):
+                tile = self.get((tx, ty, scale))
+                if tile is not None:
+                    batch.add(tile, tx * scaled_size - origin_x, ty * scaled_size - origin_y)
+
+static_tiles = StaticTileCache()
+
+# --- Compiled level cache ---
+# Spike sprites and masks, merged colliders and the collision grid depend only on the level's static data,
+# so they are compiled once into a .cache file beside the level and reloaded while its content hash matches.
+# Geometry is stored in chunks of CHUNK_CELLS grid columns so it can be streamed in around the player.
+CACHE_VERSION = 2
+CACHE_MAGIC = b"PLVC"
+CHUNK_CELLS = 8
+# magic, version, level digest, cell size, chunk cells, platform/ground/rect/shape/chunk counts, widest spike,
+# thinnest collider width and height
+CACHE_HEADER = struct.Struct("<4sH32s8I2i")
+CACHE_SHAPE = struct.Struct("<6i2i12d")  # key (relative vertices), size, SAT axes
+CACHE_CHUNK = struct.Struct("<iII")      # chunk column, file offset, byte length
+CACHE_CHUNK_COUNTS = struct.Struct("<3I")  # rects, cells, spikes
+CACHE_RECT = struct.Struct("<I4i")       # index in the full level, rect
+CACHE_CELL = struct.Struct("<2iI")       # cell x, cell y, index count
+CACHE_SPIKE = struct.Struct("<I2i")      # shape index, offset
+
+def level_digest(level):
+    """Hash of a level's content, identical for its .json and .lvl forms"""
+    return hashlib.sha256(level_to_bytes(level)).digest()
+
+def level_cache_path(path):
+    return os.path.splitext(path)[0] + ".cache"
+
+def compile_level(level):
+    """Spike placements, merged colliders and collision grid for a level"""
+    triangles = [[spike[0:2], spike[2:4], spike[4:6]] for spike in level["spikes"]]
+    ground, left, right = build_bounds(level)
+    ground = compact_rects(ground)
+    statics = compact_rects([pygame.Rect(rect) for rect in level["platforms"]])
+    return {
+        "spikes": precompute_spikes(triangles),
+        "platform_count": len(statics),
+        "ground_count": len(ground),
+        # Grid rects run platforms, ground, then the left and right walls
+        "static_grid": build_static_grid(statics + ground + [left, right]),
+    }
+
+def compiled_to_bytes(compiled, digest):
+    spikes, grid = compiled["spikes"], compiled["static_grid"]
+    chunk_width = grid.cell_size * CHUNK_CELLS
+    shapes = list({id(spike.shape): spike.shape for spike in spikes}.values())
+    shape_index = {id(shape): i for i, shape in enumerate(shapes)}
+
+    # A chunk owns whole grid columns, plus the spikes whose left edge falls inside it
+    chunk_cells, chunk_spikes = {}, {}
+    for (cx, cy), cell in grid.cells.items():
+        chunk_cells.setdefault(cx // CHUNK_CELLS, {})[(cx, cy)] = cell
+    for spike in spikes:
+        chunk_spikes.setdefault(spike.rect.left // chunk_width, []).append(spike)
+    blobs = []
+    for key in sorted(set(chunk_cells) | set(chunk_spikes)):
+        cells = chunk_cells.get(key, {})
+        members = sorted({index for cell in cells.values() for index in cell})
+        parts = [CACHE_CHUNK_COUNTS.pack(len(members), len(cells), len(chunk_spikes.get(key, [])))]
+        for index in members:
+            parts.append(CACHE_RECT.pack(index, *grid.rects[index]))
+        for (cx, cy), cell in cells.items():
+            parts.append(CACHE_CELL.pack(cx, cy, len(cell)))
+            parts.append(struct.pack(f"<{len(cell)}I", *cell))
+        for spike in chunk_spikes.get(key, []):
+            parts.append(CACHE_SPIKE.pack(shape_index[id(spike.shape)], *spike.offset))
+        blobs.append((key, b"".join(parts)))
+
+    max_spike_width = max((spike.rect.width for spike in spikes), default=0)
+    header = [CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, digest, grid.cell_size, CHUNK_CELLS,
+                                compiled["platform_count"], compiled["ground_count"], len(grid.rects), len(shapes),
+                                len(blobs), max_spike_width, grid.min_width, grid.min_height)]
+    for shape in shapes:
+        header.append(CACHE_SHAPE.pack(*(c for point in shape["key"] for c in point), *shape["size"],
+                                       *(v for axis in shape["axes"] for v in axis)))
+        header.append(pygame.image.tobytes(shape["surface"], "RGBA"))
+    offset = sum(len(part) for part in header) + CACHE_CHUNK.size * len(blobs)
+    for key, blob in blobs:
+        header.append(CACHE_CHUNK.pack(key, offset, len(blob)))
+        offset += len(blob)
+    return b"".join(header + [blob for _, blob in blobs])
+
+def write_level_cache(path, level, compiled=None):
+    compiled = compiled or compile_level(level)
+    data = compiled_to_bytes(compiled, level_digest(level))
+    write_atomic(level_cache_path(path), data)
+    return data
+
+def open_level_stream(path, level, digest=None):
+    """Stream the level read from path out of its cache, recompiling and re-saving only when the cache is missing or stale"""
+    if digest is None:
+        digest = level_digest(level)
+    try:
+        stream = LevelStream(open(level_cache_path(path), "rb"), digest)
+    except OSError:
+        stream = None
+    if stream is None or not stream.valid:
+        if stream is not None:
+            stream.close()
+        data = compiled_to_bytes(compile_level(level), digest)
+        try:
+            write_atomic(level_cache_path(path), data)
+        except OSError:
+            pass  # Read-only install: stream from the fresh compile in memory
+        stream = LevelStream(io.BytesIO(data), digest)
+    return stream
+
+# --- Level streaming ---
+STREAM_MARGIN = 256  # Reach beyond the player rect that one tick's moves and pushes can touch
+class StreamedGrid(SpatialGrid):
+    """SpatialGrid holding only the cells of loaded chunks; rects keep their index in the full level's grid"""
+    def __init__(self, cell_size, min_width, min_height):
+        super().__init__(cell_size)
+        self.rects = {}
+        self.refs = {}  # Loaded chunks holding each rect; long colliders span several
+        self.min_width = min_width  # Thinnest collider in the whole level, so sweeps match a fully loaded grid
+        self.min_height = min_height
+
+    def add_chunk(self, cells, rects):
+        self.cells.update(cells)
+        for index, rect in rects.items():
+            if index in self.refs:
+                self.refs[index] += 1
+            else:
+                self.refs[index] = 1
+                self.rects[index] = rect
+
+    def remove_chunk(self, cells, rects):
+        for key in cells:
+            del self.cells[key]
+        for index in rects:
+            self.refs[index] -= 1
+            if not self.refs[index]:
+                del self.refs[index]
+                del self.rects[index]
+
+class LevelStream:
+    """Static geometry and spikes of a compiled level, loaded a chunk (CHUNK_CELLS grid columns) at a time
+
+    Chunks the simulation or the camera need are loaded on the spot; chunks just ahead of the player are queued and
+    loaded a few per frame by pump(), and chunks left behind are released.
+    """
+    def __init__(self, file, digest):
+        self.file = file
+        self.digest = digest
+        self.loaded = {}    # Chunk column -> (cells, rects, SpikeIndex)
+        self.pending = []   # Chunk columns to prefetch, nearest first
+        header = file.read(CACHE_HEADER.size)
+        self.valid = len(header) == CACHE_HEADER.size
+        if not self.valid:
+            return
+        (magic, version, cached_digest, cell_size, chunk_cells, self.platform_count, self.ground_count, self.rect_count,
+         shape_count, chunk_count, self.max_spike_width, min_width, min_height) = CACHE_HEADER.unpack(header)
+        self.valid = magic == CACHE_MAGIC and version == CACHE_VERSION and cached_digest == digest
+        if not self.valid:
+            return
+        self.chunk_width = cell_size * chunk_cells
+        self.grid = StreamedGrid(cell_size, min_width, min_height)
+        self.shapes = []
+        for _ in range(shape_count):
+            fields = CACHE_SHAPE.unpack(file.read(CACHE_SHAPE.size))
+            key = tuple(zip(fields[0:6:2], fields[1:6:2]))
+            size = fields[6:8]
+            pixels = file.read((size[0] + 1) * (size[1] + 1) * 4)
+            shape = spike_shapes.get(key)
+            if shape is None:
+                surface = pygame.image.frombytes(pixels, (size[0] + 1, size[1] + 1), "RGBA")
+                axes = fields[8:]
+                shape = spike_shapes[key] = {
+                    "key": key,
+                    "surface": surface,
+                    "mask": pygame.mask.from_surface(surface),
+                    "axes": tuple(tuple(axes[i:i + 4]) for i in range(0, 12, 4)),
+                    "size": size,
+                }
+            self.shapes.append(shape)
+        table = file.read(CACHE_CHUNK.size * chunk_count)
+        self.chunks = {key: (offset, length) for key, offset, length in CACHE_CHUNK.iter_unpack(table)}
+
+    def close(self):
+        self.file.close()
+
+    def kind(self, index):
+        """0 for ground, 1 for the side walls, 2 for platforms: the order static geometry is drawn in"""
+        if index < self.platform_count:
+            return 2
+        return 0 if index < self.platform_count + self.ground_count else 1
+
+    def chunk_span(self, left, right):
+        return range(left // self.chunk_width, (right - 1) // self.chunk_width + 1)
+
+    def load(self, key):
+        if key in self.loaded or key not in self.chunks:
+            return
+        offset, length = self.chunks[key]
+        self.file.seek(offset)
+        data = self.file.read(length)
+        rect_count, cell_count, spike_count = CACHE_CHUNK_COUNTS.unpack_from(data)
+        pos = CACHE_CHUNK_COUNTS.size
+        rects = {}
+        for index, x, y, w, h in CACHE_RECT.iter_unpack(data[pos:pos + rect_count * CACHE_RECT.size]):
+            rects[index] = pygame.Rect(x, y, w, h)
+        pos += rect_count * CACHE_RECT.size
+        cells = {}
+        for _ in range(cell_count):
+            cx, cy, count = CACHE_CELL.unpack_from(data, pos)
+            pos += CACHE_CELL.size
+            cells[(cx, cy)] = list(struct.unpack_from(f"<{count}I", data, pos))
+            pos += 4 * count
+        spikes = []
+        for shape_id, x, y in CACHE_SPIKE.iter_unpack(data[pos:pos + spike_count * CACHE_SPIKE.size]):
+            spikes.append(Spike(self.shapes[shape_id], (x, y)))
+        self.grid.add_chunk(cells, rects)
+        self.loaded[key] = (cells, rects, SpikeIndex(spikes))
+
+    def release(self, key):
+        cells, rects, _ = self.loaded.pop(key)
+        self.grid.remove_chunk(cells, rects)
+        # Tiles rasterised from this chunk would otherwise keep its geometry alive
+        static_tiles.invalidate(pygame.Rect(key * self.chunk_width, -2 ** 30, self.chunk_width, 2 ** 30 + 2 ** 29))  # Whole column; height fits int32
+
+    def require(self, left, right):
+        """Load every chunk holding geometry or spikes that reach into the x range [left, right)"""
+        for key in self.chunk_span(left - self.max_spike_width, right):
+            if key not in self.loaded:
+                self.load(key)
+
+    def follow(self, x, velocity_x):
+        """Queue the chunks around x, two ahead in the direction of travel, and release the rest"""
+        home = int(x) // self.chunk_width
+        ahead = 1 if velocity_x >= 0 else -1
+        wanted = [home, home + ahead, home - ahead, home + 2 * ahead]
+        for key in [key for key in self.loaded if abs(key - home) > 2]:
+            self.release(key)
+        self.pending = [key for key in wanted if key not in self.loaded and key in self.chunks]
+
+    def pump(self, max_chunks=1):
+        """Load up to max_chunks queued chunks; called once per frame so prefetching never stalls a frame for long"""
+        for key in self.pending[:max_chunks]:
+            self.load(key)
+        del self.pending[:max_chunks]
+
+    def query(self, rect):
+        """Loaded spikes whose rect overlaps rect, like SpikeIndex.query"""
+        for key in self.chunk_span(rect.left - self.max_spike_width, rect.right):
+            chunk = self.loaded.get(key)
+            if chunk is not None:
+                yield from chunk[2].query(rect)
+
+# --- Level switching ---
+level_stream = None
+# All the simulation reads from the level dict once its objects are built and its geometry is streamed
+RUNTIME_LEVEL_KEYS = ("spawn", "size", "ground_y", "finish", "reset_zones", "physics_zones")
+
+def use_level(new_level, stream):
+    """Make new_level the active level, with its static geometry and spikes streamed from stream
+
+    Only RUNTIME_LEVEL_KEYS of new_level are kept, so platform and spike lists are not held for the session.
+    """
+    global level, finish_rect, moving_platforms, safe_moving_platforms, checkpoints, ground_y
+    global level_stream, spike_index, static_grid, moving_draw_grid, checkpoint_grid
+    if level_stream is not None:
+        level_stream.close()
+    finish_rect, moving_platforms, safe_moving_platforms, checkpoints = build_level_objects(new_level)
+    level = {key: new_level[key] for key in RUNTIME_LEVEL_KEYS}
+    ground_y = level["ground_y"]
+    level_stream = stream
+    static_grid = stream.grid
+    spike_index = stream
+    moving_draw_grid, checkpoint_grid = build_draw_grids()
+    static_tiles.invalidate()
+
+def load_level(path):
+    """Read a level file and make it the active level"""
+    new_level, digest = read_level_file(path)
+    use_level(new_level, open_level_stream(path, new_level, digest))
+
+use_level(level, open_level_stream(DEFAULT_LEVEL, level, default_digest))
+
+# --- Player sprite cache ---
+class RotatedSpriteCache:
+    """Copies of a sprite pre-rotated at a quantised angle step, built the first time each angle is drawn"""
+    def __init__(self, base, step=1):
+        self.base = base
+        self.step = step
+        self.frames = {}
+        self.bases = {1: base}
+
+    def get(self, angle, alpha=255, scale=1):
+        key = (round(angle / self.step) * self.step % 360, alpha, scale)
+        frame = self.frames.get(key)
+        if frame is None:
+            base = self.bases.get(scale)
+            if base is None:
+                size = (round(self.base.get_width() * scale), round(self.base.get_height() * scale))
+                base = self.bases[scale] = pygame.transform.scale(self.base, size)
+            frame = pygame.transform.rotate(base, key[0])
+            if pygame.display.get_surface() is not None:
+                frame = frame.convert_alpha()
+            if alpha != 255:
+                # Translucent copies (ghosts) are separate frames so the shared ones keep full alpha
+                frame.set_alpha(alpha)
+            self.frames[key] = frame
+        return frame
+
+def make_player_sprite():
+    sprite = pygame.Surface((state.player_width, state.player_height), pygame.SRCALPHA)
+    sprite.fill((255, 0, 0))
+    pygame.draw.rect(sprite, (255, 255, 255), (0, 0, state.player_width, 10))
+    return sprite
+
+player_sprites = RotatedSpriteCache(make_player_sprite())
+
+# --- Dynamic resolution ---
+dynamic_resolution = True  # False always renders the world at full window resolution
+
+class ResolutionScaler:
+    """Picks the world render scale from a rolling average of measured frame times"""
+    def __init__(self, levels=(1, 0.75, 0.5), budget=1 / 60, window=30):
+        self.levels = levels      # Largest first; each divides the tile size evenly
+        self.budget = budget      # Seconds of work a frame may take
+        self.window = window
+        self.samples = deque(maxlen=window)
+        self.level = 0
+
+    @property
+    def scale(self):
+        return self.levels[self.level]
+
+    def record(self, frame_seconds):
+        """Add one frame's work time and step the scale down when over budget, back up when well under"""
+        self.samples.append(frame_seconds)
+        if len(self.samples) < self.window:
+            return self.scale
+        average = sum(self.samples) / len(self.samples)
+        if average > self.budget * 0.85 and self.level < len(self.levels) - 1:
+            self.level += 1
+            self.samples.clear()  # Judge the new level on its own frames only
+        elif average < self.budget * 0.5 and self.level > 0:
+            self.level -= 1
+            self.samples.clear()
+        return self.scale
+
+resolution_scaler = ResolutionScaler()
+render_targets = {}
+
+def get_render_target(scale):
+    """Offscreen surface the world is drawn into at scale, or the window itself at full scale"""
+    if scale == 1:
+        return screen
+    target = render_targets.get(scale)
+    if target is None:
+        size = (round(screen.get_width() * scale), round(screen.get_height() * scale))
+        target = render_targets[scale] = pygame.Surface(size).convert()
+    return target
+
+
+# --- Batched drawing ---
+class ShapeSprites:
+    """Filled or outlined rectangle sprites shared by every object of the same size, color and outline width"""
+    def __init__(self):
+        self.sprites = {}
+
+    def get(self, size, color, width=0):
+        key = (size, color, width)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = pygame.Surface(size)
+            if pygame.display.get_surface() is not None:
+                sprite = sprite.convert()
+            if width:
+                sprite.fill((0, 0, 0))
+                pygame.draw.rect(sprite, color, sprite.get_rect(), width)
+                sprite.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+            else:
+                sprite.fill(color)
+            self.sprites[key] = sprite
+        return sprite
+
+shape_sprites = ShapeSprites()
+
+class DrawBatch:
+    """Sprites queued in draw order and flushed with a single fblits call
+
+    Slots and their screen rects are kept between frames, so queueing only moves existing rects.
+    """
+    def __init__(self):
+        self.slots = []  # (sprite, rect) pairs; the rect of a slot is reused every frame
+        self.count = 0
+
+    def add(self, sprite, x, y):
+        if self.count == len(self.slots):
+            self.slots.append((sprite, pygame.Rect(x, y, 0, 0)))
+        else:
+            slot = self.slots[self.count]
+            if slot[0] is not sprite:
+                slot = self.slots[self.count] = (sprite, slot[1])
+            slot[1].x = x
+            slot[1].y = y
+        self.count += 1
+
+    def add_rect(self, rect, color, origin, scale=1, width=0):
+        """Queue a world rect as a shared shape sprite on a target at scale whose top-left is origin"""
+        if scale == 1:
+            left, top, size = rect.x - origin[0], rect.y - origin[1], rect.size
+        else:
+            left, top = round(rect.left * scale), round(rect.top * scale)
+            size = (round(rect.right * scale) - left, round(rect.bottom * scale) - top)
+            left -= origin[0]
+            top -= origin[1]
+        self.add(shape_sprites.get(size, color, width), left, top)
+
+    def flush(self, surface):
+        if self.count:
+            if hasattr(surface, "fblits"):
+                surface.fblits(islice(self.slots, self.count))
+            else:
+                # Older pygame: blits() is the closest batched call
+                surface.blits(islice(self.slots, self.count), doreturn=False)
+        self.count = 0
+
+world_batch = DrawBatch()
+
+# --- Rewind ---
+REWIND_SECONDS = 10
+REWIND_SPEED = 2  # Ticks stepped back per tick while rewinding
+
+# Everything step_simulation reads from the last tick, except the checkpoint bits appended after it.
+# Moving platforms are a function of sim_ticks, so the tick count doubles as their phase.
+REWIND_STATE = struct.Struct("<9d2q3iB")
+
+def snapshot_size():
+    return REWIND_STATE.size + len(checkpoints.bits)
 
-    rect.x += state.player_velocity.x * dt
+def pack_snapshot(buffer, offset):
+    """Pack the simulation state into buffer at offset (snapshot_size() bytes)"""
+    s = state
+    flags = s.on_ground | s.on_wall_left << 1 | s.on_wall_right << 2 | s.on_wall_bottom << 3 | s.finish_reached << 4
+    REWIND_STATE.pack_into(
+        buffer, offset,
+        s.player_pos.x, s.player_pos.y, s.player_pos_reset.x, s.player_pos_reset.y,
+        s.player_velocity.x, s.player_velocity.y, s.rotation, s.target_rotation,
+        s.gravity, s.sim_ticks, s.last_jump_time, s.jump_count, s.max_jumps, s.deaths, flags,
+    )
+    bits_offset = offset + REWIND_STATE.size
+    buffer[bits_offset:bits_offset + len(checkpoints.bits)] = checkpoints.bits
 
-    for plat_rect in all_platform_rects:
-        if rect.colliderect(plat_rect):
-            if state.player_velocity.x > 0:
-                rect.right = plat_rect.left
-                state.player_velocity.x = 0
-                state.on_wall_right = True
-            elif state.player_velocity.x < 0:
-                rect.left = plat_rect.right
-                state.player_velocity.x = 0
-                state.on_wall_left = True
-            if state.on_wall_left or state.on_wall_right:
-                state.jump_count = 0
+def restore_snapshot(buffer, offset):
+    """Load the simulation state packed at offset by pack_snapshot"""
+    (x, y, reset_x, reset_y, vx, vy, rotation, target_rotation, gravity,
+     sim_ticks, last_jump_time, jump_count, max_jumps, deaths, flags) = REWIND_STATE.unpack_from(buffer, offset)
+    s = state
+    # Interpolate from where the player was drawn, so rewinding animates backwards smoothly
+    s.prev_player_pos.update(s.player_pos)
+    s.prev_rotation = s.rotation
+    s.player_pos.update(x, y)
+    s.player_pos_reset.update(reset_x, reset_y)
+    s.player_velocity.update(vx, vy)
+    s.rotation = rotation
+    s.target_rotation = target_rotation
+    s.gravity = gravity
+    s.sim_ticks = sim_ticks
+    s.last_jump_time = last_jump_time
+    s.jump_count = jump_count
+    s.max_jumps = max_jumps
+    s.deaths = deaths
+    s.on_ground = bool(flags & 1)
+    s.on_wall_left = bool(flags & 2)
+    s.on_wall_right = bool(flags & 4)
+    s.on_wall_bottom = bool(flags & 8)
+    s.finish_reached = bool(flags & 16)
+    bits_offset = offset + REWIND_STATE.size
+    checkpoints.restore(buffer[bits_offset:bits_offset + len(checkpoints.bits)])
+    kinematic_platforms.update(s.sim_ticks * SIM_DT)
 
-    state.player_pos.x = rect.x
+class RewindBuffer:
+    """Fixed-capacity ring of packed per-tick snapshots for practice rewinds"""
+    def __init__(self, seconds=REWIND_SECONDS):
+        self.capacity = int(seconds * SIM_HZ)
+        self.record_size = 0
+        self.data = bytearray()
+        self.head = 0   # Slot the next snapshot goes into
+        self.size = 0
+        self.depth = 0  # Snapshots pushed minus rewound since reset(), ignoring the capacity
+
+    def reset(self):
+        """Drop every snapshot (resizing for the level's checkpoint count) and keep the current state as the oldest"""
+        record_size = snapshot_size()
+        if record_size != self.record_size:
+            self.record_size = record_size
+            self.data = bytearray(record_size * self.capacity)
+        self.head = 0
+        self.size = 0
+        self.depth = 0
+        self.push()
+
+    def push(self):
+        if self.record_size != snapshot_size():
+            self.reset()  # First snapshot of a run or level that skipped reset()
+            return
+        pack_snapshot(self.data, self.head * self.record_size)
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.depth += 1
+
+    def rewind(self, ticks):
+        """Restore the snapshot ticks back (or the oldest one kept), discarding everything newer"""
+        ticks = min(ticks, self.size - 1)
+        self.size -= ticks
+        self.depth -= ticks
+        self.head = (self.head - ticks) % self.capacity
+        restore_snapshot(self.data, (self.head - 1) % self.capacity * self.record_size)
+
+rewind_buffer = RewindBuffer()
+
+# --- Background writes ---
+class BackgroundWriter:
+    """Runs queued save jobs off the frame loop: on a daemon thread, or where there are no threads (pygbag) in an
+    asyncio task between frames. Jobs run one at a time, in order, all on the same thread."""
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.task = None
+
+    def submit(self, job, *args):
+        self.queue.put((job, args))
+        self.start()
+
+    def start(self):
+        """Start the worker now, so the first save does not pay for it"""
+        if self.thread is not None or self.task is not None:
+            return
+        if sys.platform == "emscripten":
+            self.task = asyncio.get_running_loop().create_task(self.run_async())
+        else:
+            self.thread = threading.Thread(target=self.run_thread, name="background-writer", daemon=True)
+            self.thread.start()
+
+    def run_job(self, item):
+        job, args = item
+        try:
+            job(*args)
+        except (OSError, ValueError) as e:
+            log(f"Could not save: {e}")
+
+    def run_thread(self):
+        while (item := self.queue.get()) is not None:
+            self.run_job(item)
+
+    async def run_async(self):
+        while True:
+            while not self.queue.empty():
+                self.run_job(self.queue.get_nowait())
+            await asyncio.sleep(0.1)
+
+    def close(self):
+        """Finish every queued job"""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+            return
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        while not self.queue.empty():
+            self.run_job(self.queue.get_nowait())
+
+background_writer = BackgroundWriter()
+
+def save_file(path, data):
+    """Write data to path atomically, creating its directory"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    write_atomic(path, data)
+
+# --- Replays ---
+# A replay is the per-tick input of one run, run-length encoded: the simulation is deterministic, so stepping the
+# same inputs from a fresh run reproduces it exactly. Layout: header, input runs, keyframes, result footer.
+REPLAY_VERSION = 1
+REPLAY_MAGIC = b"PRPL"
+REPLAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replays")
+REPLAY_HEADER = struct.Struct("<4sHH32sBIIIH")  # magic, version, SIM_HZ, level digest, flags, ticks, runs, keyframes, checkpoint bytes
+REPLAY_RUN = struct.Struct("<BH")               # input bits, ticks held (long holds are split)
+REPLAY_KEYFRAME = struct.Struct("<I")           # input tick, followed by a snapshot_size() snapshot
+REPLAY_RESULT = struct.Struct("<BqII")          # finished, finish time (ms), sim ticks, deaths; then checkpoint bits
+REPLAY_SPEEDRUN = 1
+KEYFRAME_SECONDS = 5
+
+class ReplayRecorder:
+    """Records the inputs of the current run: a tick costs one compare unless the inputs changed"""
+    def __init__(self):
+        self.bits = array("B")
+        self.lengths = array("I")
+        self.keyframes = []  # (tick, snapshot, rewind depth)
+        self.keyframe_ticks = int(KEYFRAME_SECONDS * SIM_HZ)
+        self.ticks = 0
+        self.last = -1
+        self.speedrun_mode = False
+
+    def start(self):
+        """Begin recording a fresh run from the current state"""
+        del self.bits[:]
+        del self.lengths[:]
+        self.keyframes = []
+        self.ticks = 0
+        self.last = -1
+        self.speedrun_mode = state.speedrun_mode
+
+    def record(self, inputs):
+        """Append one tick of input; called before the tick runs"""
+        if self.ticks % self.keyframe_ticks == 0:
+            snapshot = bytearray(snapshot_size())
+            pack_snapshot(snapshot, 0)
+            self.keyframes.append((self.ticks, snapshot, rewind_buffer.depth))
+        if inputs == self.last:
+            self.lengths[-1] += 1
+        else:
+            self.bits.append(inputs)
+            self.lengths.append(1)
+            self.last = inputs
+        self.ticks += 1
+
+    def rewound(self, depth):
+        """Drop keyframes a rewind went back past: playback from them would lack the rewind history it needs"""
+        while self.keyframes and self.keyframes[-1][2] > depth:
+            self.keyframes.pop()
+
+    def to_bytes(self):
+        """The recording so far, with the current state as its result"""
+        runs = bytearray()
+        count = 0
+        for bits, length in zip(self.bits, self.lengths):
+            while length:
+                held = min(length, 0xFFFF)
+                runs += REPLAY_RUN.pack(bits, held)
+                length -= held
+                count += 1
+        out = bytearray(REPLAY_HEADER.pack(
+            REPLAY_MAGIC, REPLAY_VERSION, SIM_HZ, level_stream.digest, REPLAY_SPEEDRUN if self.speedrun_mode else 0,
+            self.ticks, count, len(self.keyframes), len(checkpoints.bits),
+        ))
+        out += runs
+        for tick, snapshot, _ in self.keyframes:
+            out += REPLAY_KEYFRAME.pack(tick)
+            out += snapshot
+        out += REPLAY_RESULT.pack(state.finish_reached, state.finish_time, state.sim_ticks, state.deaths)
+        out += checkpoints.bits
+        return bytes(out)
+
+replay_recorder = ReplayRecorder()
+
+class Replay:
+    """A replay file read back for playback"""
+    def __init__(self, data):
+        (magic, version, sim_hz, self.digest, flags, self.ticks, run_count, keyframe_count,
+         bit_bytes) = REPLAY_HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC:
+            raise ValueError("not a replay file")
+        if version != REPLAY_VERSION or sim_hz != SIM_HZ:
+            raise ValueError(f"replay version {version} at {sim_hz} Hz; this build plays version {REPLAY_VERSION} at {SIM_HZ} Hz")
+        self.speedrun_mode = bool(flags & REPLAY_SPEEDRUN)
+        offset = REPLAY_HEADER.size
+        self.runs = list(REPLAY_RUN.iter_unpack(data[offset:offset + run_count * REPLAY_RUN.size]))
+        offset += run_count * REPLAY_RUN.size
+        # Replays can come from anyone: the header's tick count bounds how long playing one can take
+        if len(self.runs) != run_count or sum(length for _, length in self.runs) != self.ticks:
+            raise ValueError(f"input runs do not add up to the {self.ticks} ticks in the header")
+        record_size = REPLAY_KEYFRAME.size + REWIND_STATE.size + bit_bytes
+        self.keyframes = []
+        for _ in range(keyframe_count):
+            tick, = REPLAY_KEYFRAME.unpack_from(data, offset)
+            self.keyframes.append((tick, data[offset + REPLAY_KEYFRAME.size:offset + record_size]))
+            offset += record_size
+        self.keyframe_ticks = [tick for tick, _ in self.keyframes]
+        if self.keyframe_ticks != sorted(self.keyframe_ticks) or any(tick > self.ticks for tick in self.keyframe_ticks):
+            raise ValueError("keyframes out of order or past the end of the run")
+        finished, finish_time, sim_ticks, deaths = REPLAY_RESULT.unpack_from(data, offset)
+        offset += REPLAY_RESULT.size
+        self.result = {
+            "finished": bool(finished),
+            "finish_time": finish_time,
+            "sim_ticks": sim_ticks,
+            "deaths": deaths,
+            "checkpoints": bytes(data[offset:offset + bit_bytes]),
+        }
+        if len(data) != offset + bit_bytes:
+            raise ValueError("truncated or padded replay file")
+
+    def inputs(self, start=0):
+        """Per-tick inputs from tick start on"""
+        for bits, length in self.runs:
+            if start >= length:
+                start -= length
+                continue
+            for _ in range(length - start):
+                yield bits
+            start = 0
+
+    def play(self, start=0):
+        """Reset to a fresh run at tick start and return the inputs after it
+
+        Playing from the start always begins at the level's real start; only a seek jumps to the nearest stored
+        keyframe before start, and that state comes from the file as-is.
+        """
+        reset_run(self.speedrun_mode)
+        i = bisect_right(self.keyframe_ticks, start) - 1 if start > 0 else -1
+        tick = 0
+        if i >= 0:
+            tick, snapshot = self.keyframes[i]
+            restore_snapshot(snapshot, 0)
+            rewind_buffer.reset()
+        inputs = self.inputs(tick)
+        for tick_inputs in islice(inputs, start - tick):
+            step_simulation(tick_inputs)
+        state.prev_player_pos.update(state.player_pos)
+        state.prev_rotation = state.rotation
+        return inputs
+
+def read_replay(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        return Replay(data)
+    except struct.error as e:
+        raise ValueError(f"truncated replay file ({e})") from None
+
+def replay_path():
+    """A timestamped file in REPLAY_DIR for a run finishing now"""
+    return os.path.join(REPLAY_DIR, time.strftime("run-%Y%m%d-%H%M%S.rpl"))
+
+def write_replay(path=None):
+    """Save the run just played to path (default: replay_path()); returns the path, or None if it could not be written"""
+    if path is None:
+        path = replay_path()
+    try:
+        save_file(path, replay_recorder.to_bytes())
+    except OSError as e:
+        log(f"Could not save replay: {e}")
+        return None
+    return path
+
+def replay_result():
+    """The run's outcome in the form Replay.result stores it"""
+    return {
+        "finished": state.finish_reached,
+        "finish_time": state.finish_time,
+        "sim_ticks": state.sim_ticks,
+        "deaths": state.deaths,
+        "checkpoints": bytes(checkpoints.bits),
+    }
+
+# --- Ghosts ---
+# A ghost is a speedrun's player track, one sample per sim tick, raced translucently in later speedruns. On disk the
+# track is quantised and delta encoded as zigzag varints; on load it is decoded into flat arrays indexed by tick.
+GHOST_VERSION = 1
+GHOST_MAGIC = b"PGST"
+GHOST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ghosts")
+GHOST_HEADER = struct.Struct("<4sHH32sIq")  # magic, version, SIM_HZ, level digest, samples, finish time (ms)
+GHOST_POSITION_STEPS = 8   # Stored positions are quantised to 1/8 pixel
+GHOST_ROTATION_STEPS = 16  # and rotations to 1/16 degree
+GHOST_ALPHA = 100
+race_ghosts = True         # False hides ghosts in speedrun mode
+loaded_ghosts = []         # Ghosts of runs given on the command line, raced alongside the best run
+ghosts = []                # Ghosts raced in the current run
+
+def pack_varints(values, out):
+    for n in values:
+        n = n << 1 if n >= 0 else ~n << 1 | 1  # Zigzag: small steps either way stay one byte
+        while n > 0x7F:
+            out.append(n & 0x7F | 0x80)
+            n >>= 7
+        out.append(n)
+
+def unpack_varints(data, offset, count):
+    values = []
+    n = shift = 0
+    end = len(data)
+    while len(values) < count:
+        if offset >= end:
+            raise ValueError("ghost track is shorter than its header says")
+        byte = data[offset]
+        offset += 1
+        n |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            values.append(n >> 1 if not n & 1 else ~(n >> 1))
+            n = shift = 0
+    return values
+
+class Ghost:
+    """A decoded ghost track: player position and rotation after each sim tick"""
+    __slots__ = ("digest", "finish_time", "xs", "ys", "rotations")
+
+    def __init__(self, digest, finish_time, xs, ys, rotations):
+        self.digest = digest
+        self.finish_time = finish_time
+        self.xs = xs
+        self.ys = ys
+        self.rotations = rotations
+
+    def __len__(self):
+        return len(self.xs)
+
+    def sample(self, tick, alpha):
+        """Position and rotation alpha of the way from tick - 1 to tick, or None once the track has ended"""
+        if tick >= len(self.xs):
+            return None
+        prev = tick - 1 if tick else 0
+        xs, ys, rotations = self.xs, self.ys, self.rotations
+        return (xs[prev] + (xs[tick] - xs[prev]) * alpha,
+                ys[prev] + (ys[tick] - ys[prev]) * alpha,
+                rotations[prev] + (rotations[tick] - rotations[prev]) * alpha)
+
+    def to_bytes(self):
+        out = bytearray(GHOST_HEADER.pack(GHOST_MAGIC, GHOST_VERSION, SIM_HZ, self.digest, len(self), self.finish_time))
+        deltas = []
+        last_x = last_y = last_rotation = 0
+        for x, y, rotation in zip(self.xs, self.ys, self.rotations):
+            x = round(x * GHOST_POSITION_STEPS)
+            y = round(y * GHOST_POSITION_STEPS)
+            rotation = round(rotation * GHOST_ROTATION_STEPS)
+            deltas += (x - last_x, y - last_y, rotation - last_rotation)
+            last_x, last_y, last_rotation = x, y, rotation
+        pack_varints(deltas, out)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, sim_hz, digest, samples, finish_time = GHOST_HEADER.unpack_from(data)
+        if magic != GHOST_MAGIC:
+            raise ValueError("not a ghost file")
+        if version != GHOST_VERSION or sim_hz != SIM_HZ:
+            raise ValueError(f"ghost version {version} at {sim_hz} Hz; this build races version {GHOST_VERSION} at {SIM_HZ} Hz")
+        deltas = unpack_varints(data, GHOST_HEADER.size, samples * 3)
+        tracks = []
+        for axis, steps in enumerate((GHOST_POSITION_STEPS, GHOST_POSITION_STEPS, GHOST_ROTATION_STEPS)):
+            track = array("f")
+            value = 0
+            for delta in islice(deltas, axis, None, 3):
+                value += delta
+                track.append(value / steps)
+            tracks.append(track)
+        return cls(digest, finish_time, *tracks)
+
+class GhostRecorder:
+    """Collects the player track of the current speedrun"""
+    def __init__(self):
+        self.start_arrays()
+
+    def start_arrays(self):
+        # Fresh arrays rather than cleared ones: ghost() hands the last run's over without copying
+        self.xs = array("f")
+        self.ys = array("f")
+        self.rotations = array("f")
+
+    def start(self):
+        self.start_arrays()
+        self.record()
+
+    def record(self):
+        """Append the state after the tick just stepped"""
+        self.xs.append(state.player_pos.x)
+        self.ys.append(state.player_pos.y)
+        self.rotations.append(state.rotation)
+
+    def ghost(self):
+        return Ghost(level_stream.digest, state.finish_time, self.xs, self.ys, self.rotations)
+
+ghost_recorder = GhostRecorder()
+
+def read_ghost(path):
+    with open(path, "rb") as f:
+        return Ghost.from_bytes(f.read())
+
+def best_ghost_path():
+    return os.path.join(GHOST_DIR, f"best-{level_stream.digest.hex()[:16]}.gst")
+
+best_ghosts = {}  # Level digest -> the level's best ghost (or None), read from disk once per session
+
+def read_best_ghost():
+    """The fastest speedrun saved for the active level, or None"""
+    digest = level_stream.digest
+    if digest not in best_ghosts:
+        try:
+            best_ghosts[digest] = read_ghost(best_ghost_path())
+        except (OSError, ValueError, struct.error):
+            best_ghosts[digest] = None
+    return best_ghosts[digest]
+
+def save_ghost_file(ghost, path):
+    save_file(path, ghost.to_bytes())
+
+def save_best_ghost():
+    """Keep the speedrun just finished as the level's best ghost if it beat the saved one; encoded and written off the frame"""
+    if not (state.speedrun_mode and state.finish_reached):
+        return
+    best = read_best_ghost()
+    if best is not None and best.finish_time <= state.finish_time:
+        return
+    ghost = best_ghosts[level_stream.digest] = ghost_recorder.ghost()
+    background_writer.submit(save_ghost_file, ghost, best_ghost_path())
+
+def ghost_from_replay(replay):
+    """Simulate a speedrun replay to recover its track; leaves the simulation on the replay's final tick"""
+    if not replay.speedrun_mode:
+        raise ValueError("only speedrun replays can be raced as ghosts")
+    if replay.digest != level_stream.digest:
+        raise ValueError("recorded on a different level")
+    for tick_inputs in replay.play():
+        if state.game_phase != "playing":
+            break
+        step_simulation(tick_inputs)
+    return ghost_recorder.ghost()
+
+def start_ghosts():
+    """Pick the ghosts for a run starting now: the level's best speedrun plus any loaded runs, in speedrun mode only"""
+    global ghosts
+    ghosts = []
+    if not (race_ghosts and state.speedrun_mode):
+        return
+    best = read_best_ghost()
+    if best is not None:
+        ghosts.append(best)
+    ghosts += [ghost for ghost in loaded_ghosts if ghost.digest == level_stream.digest]
+
+# --- Split timer ---
+SPLIT_SHOW_SECONDS = 3
+FINISH_SPLIT = -1  # Checkpoint index the finish is stored under
+RUNS_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runs.sqlite3")
+RUNS_SCHEMA_VERSION = 2
+# sim_ns: simulation time (1/SIM_HZ steps), what runs are ranked by; wall_ns: perf_counter_ns real time
+RUNS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY, level TEXT NOT NULL, speedrun INTEGER NOT NULL, finished_at REAL NOT NULL,
+    sim_ns INTEGER NOT NULL, wall_ns INTEGER NOT NULL, deaths INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_level ON runs (level, speedrun, sim_ns);
+CREATE TABLE IF NOT EXISTS splits (
+    run_id INTEGER NOT NULL REFERENCES runs (id), checkpoint INTEGER NOT NULL,
+    sim_ns INTEGER NOT NULL, wall_ns INTEGER NOT NULL
+);
+"""
+
+class SplitTimer:
+    """Splits of the current run at each checkpoint and the finish, compared live against the personal best
+
+    Every split has two times since the start, in ns. The simulation time (whole ticks, like state.finish_time) ranks
+    runs, so the personal best agrees with the best ghost and replays. The wall time is a perf_counter_ns stamp taken
+    when the tick is stepped: real elapsed time at full timer resolution, though ticks stepped together to catch up
+    after a slow frame share that frame's stamp.
+    """
+    def __init__(self):
+        self.start_tick = 0
+        self.start_ns = 0
+        self.sim_splits = {}     # Checkpoint index (FINISH_SPLIT for the finish) -> simulation ns since the start
+        self.wall_splits = {}    # Checkpoint index -> perf_counter_ns since the start
+        self.best = {}           # The personal best's simulation splits, keyed the same way
+        self.last_delta = None   # ns behind (+) or ahead (-) of the best at the latest split; None if the best lacks it
+        self.last_split_ns = 0   # perf_counter_ns of the latest split, to show it for a while
+        self.personal_best = False
+
+    def start(self, best=None):
+        self.start_tick = state.sim_ticks
+        self.start_ns = time.perf_counter_ns()
+        self.sim_splits = {}
+        self.wall_splits = {}
+        self.best = best or {}
+        self.last_delta = None
+        self.last_split_ns = 0
+        self.personal_best = False
+
+    def split(self, index):
+        now = time.perf_counter_ns()
+        elapsed = (state.sim_ticks - self.start_tick) * 1_000_000_000 // SIM_HZ
+        self.sim_splits[index] = elapsed
+        self.wall_splits[index] = now - self.start_ns
+        best = self.best.get(index)
+        self.last_delta = None if best is None else elapsed - best
+        self.last_split_ns = now
+
+    def rewound(self):
+        """Forget the splits of checkpoints a rewind un-collected
+
+        Checked per checkpoint: linked checkpoints are collected without a split, so the split count says nothing.
+        A rewind also undoes the finish.
+        """
+        kept = {index for index in self.sim_splits if index != FINISH_SPLIT and checkpoints.is_collected(index)}
+        self.sim_splits = {index: t for index, t in self.sim_splits.items() if index in kept}
+        self.wall_splits = {index: t for index, t in self.wall_splits.items() if index in kept}
+
+    def showing(self):
+        """The latest split's delta while it is still on screen, else None"""
+        if self.last_delta is None or time.perf_counter_ns() - self.last_split_ns > SPLIT_SHOW_SECONDS * 1_000_000_000:
+            return None
+        return self.last_delta
+
+split_timer = SplitTimer()
+
+class RunStore:
+    """Finished runs and their splits in a local SQLite file
+
+    Personal bests are read once when the store opens. Saving a run only queues it for the background writer.
+    """
+    def __init__(self, path=RUNS_DB):
+        self.path = path
+        self.bests = {}  # (level digest hex, speedrun) -> (finish sim_ns, simulation splits)
+        self.enabled = sqlite3 is not None
+        if not self.enabled:
+            return
+        try:
+            self.load_bests()
+        except sqlite3.Error as e:
+            log(f"Run history unavailable: {e}")
+            self.enabled = False
+
+    def connect(self):
+        db = sqlite3.connect(self.path)
+        if db.execute("PRAGMA user_version").fetchone()[0] != RUNS_SCHEMA_VERSION:
+            # Version 1 kept one time_ns column whose meaning changed from wall to tick time; it cannot be converted
+            db.executescript("DROP TABLE IF EXISTS splits; DROP TABLE IF EXISTS runs;")
+            db.executescript(RUNS_SCHEMA)
+            db.execute(f"PRAGMA user_version = {RUNS_SCHEMA_VERSION}")
+        return db
+
+    def load_bests(self):
+        db = self.connect()
+        try:
+            # SQLite fills the bare id column from the row MIN() picked
+            rows = db.execute("SELECT id, level, speedrun, MIN(sim_ns) FROM runs GROUP BY level, speedrun").fetchall()
+            for run_id, level, speedrun, sim_ns in rows:
+                splits = dict(db.execute("SELECT checkpoint, sim_ns FROM splits WHERE run_id = ?", (run_id,)))
+                self.bests[(level, bool(speedrun))] = (sim_ns, splits)
+        finally:
+            db.close()
+
+    def best(self, digest, speedrun):
+        """(finish sim_ns, simulation splits) of the personal best on a level, or None"""
+        return self.bests.get((digest.hex(), bool(speedrun)))
+
+    def save(self, digest, speedrun, deaths, sim_splits, wall_splits):
+        """Queue a finished run; returns True if its simulation time is a new personal best"""
+        key = (digest.hex(), bool(speedrun))
+        sim_ns = sim_splits[FINISH_SPLIT]
+        best = self.bests.get(key)
+        new_best = best is None or sim_ns < best[0]
+        if new_best:
+            self.bests[key] = (sim_ns, dict(sim_splits))
+        if self.enabled:
+            run = (key[0], int(speedrun), time.time(), deaths, dict(sim_splits), dict(wall_splits))
+            background_writer.submit(self.write, run)
+        return new_best
+
+    def write(self, run):
+        level, speedrun, finished_at, deaths, sim_splits, wall_splits = run
+        try:
+            db = self.connect()
+            try:
+                with db:
+                    cursor = db.execute(
+                        "INSERT INTO runs (level, speedrun, finished_at, sim_ns, wall_ns, deaths) VALUES (?, ?, ?, ?, ?, ?)",
+                        (level, speedrun, finished_at, sim_splits[FINISH_SPLIT], wall_splits[FINISH_SPLIT], deaths),
+                    )
+                    db.executemany("INSERT INTO splits (run_id, checkpoint, sim_ns, wall_ns) VALUES (?, ?, ?, ?)",
+                                   [(cursor.lastrowid, index, t, wall_splits[index]) for index, t in sim_splits.items()])
+            finally:
+                db.close()
+        except sqlite3.Error as e:
+            log(f"Could not save run: {e}")
+
+def step_simulation(inputs):
+    """Advance the playing phase by one fixed SIM_DT tick"""
+    replay_recorder.record(inputs)
+    if inputs & INPUT_REWIND and not state.speedrun_mode:
+        rewind_buffer.rewind(REWIND_SPEED)
+        replay_recorder.rewound(rewind_buffer.depth)
+        split_timer.rewound()
+        return
+
+    dt = SIM_DT
+    state.sim_ticks += 1
+    current_time = sim_time_ms()
+    state.prev_player_pos.update(state.player_pos)
+    state.prev_rotation = state.rotation
+
+    # Check for special collision zones
+    checkpoints.apply_links()
+
+    for area in level["reset_zones"]:
+        if in_area(area, state.player_pos.x, state.player_pos.y):
+            player_reset()
+            break
+
+    player_rect = pygame.Rect(int(state.player_pos.x), int(state.player_pos.y), state.player_width, state.player_height)
+
+    # Stream level chunks around the player; anything this tick can touch is loaded now
+    level_stream.follow(player_rect.x, state.player_velocity.x)
+    level_stream.require(player_rect.left - STREAM_MARGIN, player_rect.right + STREAM_MARGIN)
+
+    # Update platforms
+    kinematic_platforms.update(state.sim_ticks * SIM_DT)
+
+    # Adjust physics based on position
+    for area, gravity, max_jumps in level["physics_zones"]:
+        if in_area(area, player_rect.x, player_rect.y):
+            state.max_jumps = max_jumps
+            state.gravity = gravity
+            break
+    else:
+        state.max_jumps = 2
+        state.gravity = 1500
+
+    # Physics
+    resolve_collisions(player_rect, static_grid, safe_moving_platforms, dt)
+    if not state.on_wall_left and not state.on_wall_right and not state.on_wall_bottom and not state.on_ground:
+        if not state.finish_reached:
+            state.player_velocity.y += state.gravity * dt
+    else:
+        if state.on_wall_left or state.on_wall_right or state.on_wall_bottom:
+            state.player_velocity.y = 0
+
+    # Check moving platform collision
+    for mp in moving_platforms:
+        if player_rect.colliderect(mp.rect):
+            player_reset()
+            break
+
+    # Check out of bounds
+    if state.player_pos.x > state.game_size or state.player_pos.x < -state.game_size or state.player_pos.y > ground_y + 500:
+        player_reset()
+
+    # Movement
+    if inputs & INPUT_LEFT:
+        state.player_velocity.x = -state.move_speed
+    elif inputs & INPUT_RIGHT:
+        state.player_velocity.x = state.move_speed
+    else:
+        state.player_velocity.x = 0
+
+    # Rotation
+    if state.on_wall_left:
+        state.target_rotation = -90
+    elif state.on_wall_right:
+        state.target_rotation = 90
+    else:
+        state.target_rotation = 0
+    state.rotation += (state.target_rotation - state.rotation) * min(10 * dt, 1)
+
+    # Jump
+    if inputs & INPUT_JUMP and current_time - state.last_jump_time >= state.jump_cooldown and state.jump_count < state.max_jumps:
+        state.player_velocity.y = -state.jump_strength
+        state.jump_count += 1
+        state.last_jump_time = current_time
+
+    # Reset
+    if inputs & INPUT_RESET:
+        player_reset()
+
+    # Check spike collision
+    if check_collision_with_spikes(player_rect):
+        player_reset()
+
+    # Check checkpoints
+    for index in checkpoint_grid.query(player_rect):
+        rect = checkpoints.rects[index]
+        if not checkpoints.is_collected(index) and player_rect.colliderect(rect):
+            checkpoints.collect(index)
+            split_timer.split(index)
+            state.player_pos_reset.update(rect.x, rect.y)
+            log(f"Checkpoint reached!")
+
+    # Check finish
+    if player_rect.colliderect(finish_rect) and not state.finish_reached and (checkpoints.all_collected or state.speedrun_mode):
+        state.finish_reached = True
+        state.finish_time = current_time - state.speedrun_start_time
+        split_timer.split(FINISH_SPLIT)
+        state.game_phase = "finished"
+        log(f"FINISH! Time: {state.finish_time/1000:.2f}s, Deaths: {state.deaths}")
+
+    rewind_buffer.push()
+    if state.speedrun_mode:
+        ghost_recorder.record()
+
+def draw_playing(alpha, scale=1):
+    """Draw the world with moving objects interpolated alpha of the way from the previous tick to the current one
+
+    The world is rendered at scale into an offscreen target and stretched to the window; the HUD is always full resolution.
+    """
+    player_pos = state.prev_player_pos.lerp(state.player_pos, alpha)
+    rotation = state.prev_rotation + (state.rotation - state.prev_rotation) * alpha
+
+    # Update camera
+    state.camera_offset.x = player_pos.x - screen.get_width() / 2 + state.player_width / 2
+    state.camera_offset.y = player_pos.y - screen.get_height() / 2 + state.player_height / 2
+
+    # Only objects overlapping the camera are drawn
+    view = pygame.Rect(int(state.camera_offset.x), int(state.camera_offset.y), screen.get_width(), screen.get_height())
+
+    # Draw world
+    # Tiles overlapping the view reach up to a tile beyond it, and spike sprites one pixel past their rects
+    level_stream.require(view.left - static_tiles.tile_size - 1, view.right + static_tiles.tile_size + 1)
+
+    # Everything in the world goes through one batch, queued back to front
+    target = get_render_target(scale)
+    origin = (round(view.x * scale), round(view.y * scale))
+    target.fill((0, 0, 0))
+    static_tiles.queue(world_batch, view, scale)
+
+    kinematic_platforms.update((state.sim_ticks - 1 + alpha) * SIM_DT, kinematic_platforms.draw_rects)
+    for index in moving_draw_grid.query(view):
+        mp, color = moving_draw_grid.items[index]
+        world_batch.add_rect(mp.draw_rect, color, origin, scale)
+
+    # Draw ghosts behind the player
+    for ghost in ghosts:
+        sample = ghost.sample(state.sim_ticks, alpha)
+        if sample is not None:
+            ghost_x, ghost_y, ghost_rotation = sample
+            sprite = player_sprites.get(-ghost_rotation, GHOST_ALPHA, scale)
+            center_x = int((ghost_x - state.camera_offset.x + state.player_width / 2) * scale)
+            center_y = int((ghost_y - state.camera_offset.y + state.player_height / 2) * scale)
+            world_batch.add(sprite, center_x - sprite.get_width() // 2, center_y - sprite.get_height() // 2)
+
+    # Draw player
+    sprite = player_sprites.get(-rotation, scale=scale)
+    center_x = int((player_pos.x - state.camera_offset.x + state.player_width / 2) * scale)
+    center_y = int((player_pos.y - state.camera_offset.y + state.player_height / 2) * scale)
+    world_batch.add(sprite, center_x - sprite.get_width() // 2, center_y - sprite.get_height() // 2)
+
+    # Draw checkpoints
+    outline = max(1, round(3 * scale))
+    for index in checkpoint_grid.query(view):
+        color = (0, 255, 0) if checkpoints.is_collected(index) else (150, 50, 220)
+        world_batch.add_rect(checkpoints.rects[index], color, origin, scale, outline)
+
+    # Draw finish line
+    if view.colliderect(finish_rect):
+        world_batch.add_rect(finish_rect, (0, 255, 255), origin, scale)
+
+    world_batch.flush(target)
+
+    if target is not screen:
+        pygame.transform.scale(target, screen.get_size(), screen)
+
+    # Draw UI
+    draw_hud_field(screen, checkpoint_font, hud_digits, "Checkpoints: ", f"{checkpoints.count}/{len(checkpoints)}", (10, 10))
+
+    fps = clock.get_fps()
+    draw_hud_field(screen, fps_font, fps_digits, "FPS: ", str(int(fps)), (10, 50))
+
+    speedrun_time = (sim_time_ms() - state.speedrun_start_time) / 1000
+    draw_hud_field(screen, checkpoint_font, hud_digits, "Time: ", f"{speedrun_time:.2f}s", (10, 90))
+
+    draw_hud_field(screen, checkpoint_font, hud_digits, "Deaths: ", str(state.deaths), (10, 130))
+
+    delta = split_timer.showing()
+    if delta is not None:
+        atlas = ahead_digits if delta < 0 else behind_digits
+        draw_hud_field(screen, checkpoint_font, atlas, "Split: ", f"{delta / 1e9:+.2f}s", (10, 170))
+
+# --- Headless simulation ---
+def reset_run(speedrun_mode=False):
+    """Fresh GameState and level-load positions for moving platforms and checkpoints"""
+    global state
+    state = GameState()
+    state.speedrun_mode = speedrun_mode
+    state.game_phase = "playing"
+    kinematic_platforms.update(0)
+    checkpoints.reset()
+    rewind_buffer.reset()
+    replay_recorder.start()
+    ghost_recorder.start()
+    split_timer.start()
+
+def run_headless(inputs, speedrun_mode=False, max_ticks=None):
+    """Step one run from a per-tick input stream with no window, until the finish, the inputs run out or max_ticks"""
+    reset_run(speedrun_mode)
+    start = time.perf_counter()
+    for tick_inputs in inputs:
+        if state.game_phase != "playing" or (max_ticks is not None and state.sim_ticks >= max_ticks):
+            break
+        step_simulation(tick_inputs)
+    return state.sim_ticks, time.perf_counter() - start
+
+INPUT_KEYS = {"L": INPUT_LEFT, "R": INPUT_RIGHT, "J": INPUT_JUMP, "X": INPUT_RESET, "B": INPUT_REWIND}
+
+def read_input_script(path):
+    """Per-tick inputs from a script of "<ticks> <keys>" lines, keys drawn from L, R, J, X, B (rewind) or - for none"""
+    inputs = []
+    with open(path) as f:
+        for line in f:
+            line = line.split("#")[0].strip()
+            if not line:
+                continue
+            ticks, keys = line.split()
+            bits = 0
+            for key in keys.upper():
+                if key != "-":
+                    bits |= INPUT_KEYS[key]
+            inputs.extend([bits] * int(ticks))
+    return inputs
+
+def headless_main(argv):
+    global headless
+    headless = True
+    parser = argparse.ArgumentParser(description="Step the game without a display")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("script", help="input script of '<ticks> <keys>' lines")
+    parser.add_argument("--runs", type=int, default=1, help="how many times to replay the script")
+    parser.add_argument("--speedrun", action="store_true", help="finish without collecting every checkpoint")
+    parser.add_argument("--max-ticks", type=int, default=None)
+    parser.add_argument("--level", help="level file (.json or .lvl) to run instead of the default")
+    parser.add_argument("--save-replay", metavar="FILE", help="write the last run as a replay file")
+    args = parser.parse_args(argv)
+
+    if args.level:
+        load_level(args.level)
+    inputs = read_input_script(args.script)
+    total_ticks = 0
+    total_time = 0.0
+    for _ in range(args.runs):
+        ticks, elapsed = run_headless(inputs, args.speedrun, args.max_ticks)
+        total_ticks += ticks
+        total_time += elapsed
+
+    result = f"finished in {state.finish_time / 1000:.3f}s" if state.finish_reached else "did not finish"
+    print(f"{result}, deaths: {state.deaths}, checkpoints: {checkpoints.count}/{len(checkpoints)}, position: ({state.player_pos.x:.1f}, {state.player_pos.y:.1f})")
+    if args.save_replay:
+        write_replay(args.save_replay)
+    print(f"{args.runs} run(s), {total_ticks} steps ({total_ticks / SIM_HZ:.1f}s of game time) in {total_time:.3f}s: {total_ticks / max(total_time, 1e-9):,.0f} steps/s")
+
+def verify_replay(replay):
+    """Re-simulate replay from the level's start with no display; returns what differs from the file (empty if nothing)
+
+    Nothing but the inputs is trusted: the run starts from reset_run, and each stored keyframe must match the
+    re-simulated state at its tick.
+    """
+    reset_run(replay.speedrun_mode)
+    problems = []
+    keyframes = deque(replay.keyframes)
+    snapshot = bytearray(snapshot_size())
+    for tick, tick_inputs in enumerate(islice(replay.inputs(), replay.ticks)):
+        while keyframes and keyframes[0][0] == tick:
+            pack_snapshot(snapshot, 0)
+            if keyframes.popleft()[1] != snapshot:
+                problems.append(f"keyframe at tick {tick} differs from the re-simulated state")
+        if state.game_phase != "playing":
+            break
+        step_simulation(tick_inputs)
+    for tick, _ in keyframes:
+        problems.append(f"keyframe at tick {tick} is past the end of the re-simulated run")
+    actual = replay_result()
+    for field in ("finished", "finish_time", "deaths", "checkpoints", "sim_ticks"):
+        if replay.result[field] != actual[field]:
+            problems.append(f"{field} claimed {replay.result[field]!r}, got {actual[field]!r}")
+    return problems
+
+def replay_main(argv):
+    """Play back a replay file: in a window at any speed, or headless to check it still reproduces its result"""
+    global headless
+    parser = argparse.ArgumentParser(description="Play back a recorded run")
+    parser.add_argument("--replay", required=True, metavar="FILE")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed; 1 is real time, 4 fast-forwards")
+    parser.add_argument("--seek", type=float, default=0.0, help="start this many seconds into the run (window only)")
+    parser.add_argument("--headless", action="store_true",
+                        help="no display: re-simulate the whole run as fast as possible and check it against the file")
+    parser.add_argument("--level", help="level file the replay was recorded on, if not the default")
+    args = parser.parse_args(argv)
+
+    if args.level:
+        load_level(args.level)
+    try:
+        replay = read_replay(args.replay)
+    except (OSError, ValueError) as e:
+        sys.exit(f"{args.replay}: {e}")
+    if replay.digest != level_stream.digest:
+        sys.exit(f"{args.replay} was recorded on a different level")
+    start = min(int(args.seek * SIM_HZ), replay.ticks)
+    if not args.headless:
+        asyncio.run(main(replay, args.speed, start))
+        return
+
+    headless = True
+    begin = time.perf_counter()
+    problems = verify_replay(replay)
+    elapsed = time.perf_counter() - begin
+    result = f"finished in {state.finish_time / 1000:.3f}s" if state.finish_reached else "did not finish"
+    print(f"{result}, deaths: {state.deaths}, checkpoints: {checkpoints.count}/{len(checkpoints)}: "
+          f"{'DOES NOT match the recording' if problems else 'matches the recording'}")
+    for problem in problems:
+        print(f"  {problem}")
+    print(f"{state.sim_ticks} ticks in {elapsed:.3f}s")
+    if problems:
+        sys.exit(1)
+
+# --- Replay verification ---
+# Submitted replays are checked in a process pool. Each worker maps level digests to level files once, and keeps
+# its active level loaded between replays; the replays are handed out grouped by level so switches are rare.
+verify_levels = {}   # Level digest -> level file, per worker
+verify_active = None  # Digest of the level this worker loaded itself
+
+def init_verify_worker(level_paths):
+    global headless
+    headless = True
+    for path in level_paths:
+        try:
+            verify_levels.setdefault(read_level_file(path)[1], path)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Skipping level {path}: {e}")
+
+def verify_replay_file(path):
+    """Re-simulate one replay; returns (path, list of mismatches or an error message, ticks simulated)"""
+    try:
+        replay = read_replay(path)
+    except (OSError, ValueError, struct.error) as e:
+        return path, f"unreadable: {e}", 0
+    global verify_active
+    try:
+        # Until its first load a forked worker's level stream is the parent's open file, sharing its read offset
+        if replay.digest != verify_active:
+            if replay.digest not in verify_levels:
+                return path, "recorded on an unknown level", 0
+            verify_active = None
+            load_level(verify_levels[replay.digest])
+            verify_active = replay.digest
+        problems = verify_replay(replay)
+    except Exception as e:  # One bad replay or level fails that replay, not the whole batch
+        return path, f"error: {type(e).__name__}: {e}", 0
+    return path, problems or None, state.sim_ticks
+
+def replay_digest(path):
+    """Sort key grouping replay files by level; unreadable files sort first and fail in a worker"""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(REPLAY_HEADER.size)
+    except OSError:
+        return b""
+    return REPLAY_HEADER.unpack(header)[3] if len(header) == REPLAY_HEADER.size else b""
+
+def verify_main(argv):
+    """Check a directory of replays still reproduce their claimed finish time, deaths and checkpoints"""
+    import multiprocessing  # Command line only; not needed (or available) in the web build
+    parser = argparse.ArgumentParser(description="Verify replay files in parallel")
+    parser.add_argument("--verify-replays", required=True, metavar="DIR")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--level", action="append", default=[], metavar="FILE",
+                        help="level file replays may be recorded on, besides those in levels/; may be repeated")
+    args = parser.parse_args(argv)
+
+    paths = sorted((os.path.join(args.verify_replays, name) for name in os.listdir(args.verify_replays)
+                    if name.endswith(".rpl")))
+    paths.sort(key=replay_digest)
+    # Packed .lvl files load faster than their .json sources, so they claim a shared digest first
+    level_paths = args.level + sorted((os.path.join(LEVEL_DIR, name) for name in os.listdir(LEVEL_DIR)
+                                       if name.endswith((".lvl", ".json"))), key=lambda path: not path.endswith(".lvl"))
+    workers = max(1, min(args.workers, len(paths)))
+
+    start = time.perf_counter()
+    failures = []
+    total_ticks = 0
+    with multiprocessing.Pool(workers, init_verify_worker, (level_paths,)) as pool:
+        chunksize = max(1, len(paths) // (workers * 8))
+        for path, problem, ticks in pool.imap_unordered(verify_replay_file, paths, chunksize):
+            total_ticks += ticks
+            if problem is not None:
+                failures.append((path, problem))
+    elapsed = time.perf_counter() - start
+
+    for path, problem in sorted(failures):
+        if isinstance(problem, str):
+            print(f"{path}: {problem}")
+        else:
+            print(f"{path}: MISMATCH {'; '.join(problem)}")
+    print(f"{len(paths)} replay(s), {len(paths) - len(failures)} verified, {len(failures)} failed")
+    print(f"{workers} worker(s), {elapsed:.2f}s: {len(paths) / max(elapsed, 1e-9):,.1f} replays/s, "
+          f"{total_ticks / max(elapsed, 1e-9):,.0f} ticks/s ({total_ticks / SIM_HZ / max(elapsed, 1e-9):,.0f}x real time)")
+    if failures:
+        sys.exit(1)
+
+def level_tool_main(argv):
+    """Offline level commands: convert between .json and packed .lvl, or compile a level's .cache"""
+    parser = argparse.ArgumentParser(description="Convert or compile level files")
+    command = parser.add_mutually_exclusive_group(required=True)
+    command.add_argument("--convert-level", nargs=2, metavar=("SOURCE", "DEST"), help="e.g. pack the authored JSON into the shipped .lvl")
+    command.add_argument("--compile-level", metavar="LEVEL", help="precompute spikes, colliders and indexes into LEVEL's .cache")
+    args = parser.parse_args(argv)
+
+    if args.convert_level:
+        source, dest = args.convert_level
+        start = time.perf_counter()
+        new_level = read_level(source)
+        loaded = time.perf_counter() - start
+        write_level(new_level, dest)
+        print(f"{source} -> {dest} ({os.path.getsize(dest):,} bytes); read in {loaded * 1000:.2f} ms")
+        return
+
+    path = args.compile_level
+    new_level = read_level(path)
+    start = time.perf_counter()
+    write_level_cache(path, new_level)
+    compiled = time.perf_counter() - start
+    start = time.perf_counter()
+    open_level_stream(path, new_level).close()
+    loaded = time.perf_counter() - start
+    print(f"{path} -> {level_cache_path(path)} ({os.path.getsize(level_cache_path(path)):,} bytes); "
+          f"compiled in {compiled * 1000:.2f} ms, loads in {loaded * 1000:.2f} ms")
+
+def game_main(argv):
+    """Play the game, optionally on another level or racing ghosts of given runs in speedrun mode"""
+    global state
+    parser = argparse.ArgumentParser(description="Platform Speedrun")
+    parser.add_argument("--level", help="level file (.json or .lvl) to play instead of the default")
+    parser.add_argument("--ghost", action="append", default=[], metavar="FILE",
+                        help="ghost (.gst) or speedrun replay (.rpl) to race; may be repeated")
+    args, _ = parser.parse_known_args(argv)  # Tolerate whatever else the web runtime passes
+
+    if args.level:
+        load_level(args.level)
+    for path in args.ghost:
+        try:
+            if path.endswith(".rpl"):
+                loaded_ghosts.append(ghost_from_replay(read_replay(path)))
+            else:
+                loaded_ghosts.append(read_ghost(path))
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Skipping ghost {path}: {e}")
+    if args.level or args.ghost:
+        # A new spawn point, or converting replays ran the simulation: start from the level's initial state
+        state = GameState()
+        kinematic_platforms.update(0)
+        checkpoints.reset()
+    asyncio.run(main())
+
+# --- Menu screens ---
+# Menus are static between inputs, so they redraw only when something changes
+MENU_PHASES = ("death_screen_prompt", "speedrun_prompt", "rules", "finished")
+ACTIVE_FPS = 60
+IDLE_FPS = 15       # Menu tick rate: enough for responsive clicks and hover
+UNFOCUSED_FPS = 5   # Window in the background: just keep the event queue drained
+
+RULES_LINES = [
+    "Welcome to Platform Speedrun!",
+    "Press SPACE to start",
+    "WASD/Arrows to move, SPACE to jump",
+    "R to reset, avoid red spikes!",
+    "Hold Q to rewind (not in speedrun mode)",
+    "Collect checkpoints (purple/green)",
+    "Reach cyan finish line"
+]
+
+def draw_menu_screen(phase, buttons):
+    """Draw a full menu/results screen for the given phase."""
+    if phase in ("death_screen_prompt", "speedrun_prompt"):
+        screen.fill((30, 30, 30))
+        label = "Enable Death Screen?" if phase == "death_screen_prompt" else "Enable Speedrun Mode?"
+        prompt_text = text_cache.render(font, label, (255, 255, 255))
+        prompt_rect = prompt_text.get_rect(center=(screen_width // 2, screen_height // 3))
+        screen.blit(prompt_text, prompt_rect)
+        for button in buttons:
+            button.draw(screen)
+
+    elif phase == "rules":
+        screen.fill((0, 0, 0))
+        for i, line in enumerate(RULES_LINES):
+            text_surf = text_cache.render(checkpoint_font, line, (255, 255, 255))
+            screen.blit(text_surf, (screen.get_width() // 2 - text_surf.get_width() // 2, 200 + i * 60))
+
+    elif phase == "finished":
+        screen.fill((0, 0, 0))
+        minutes = state.finish_time // 60000
+        seconds = (state.finish_time % 60000) // 1000
+        milliseconds = (state.finish_time % 1000) // 10
+
+        finish_text = text_cache.render(
+            font,
+            f"FINISH! Time: {minutes:02}:{seconds:02}.{milliseconds:02}",
+            (0, 255, 255)
+        )
+        screen.blit(finish_text, (
+            screen.get_width() / 2 - finish_text.get_width() / 2,
+            screen.get_height() / 2 - 50
+        ))
+
+        deaths_text = text_cache.render(checkpoint_font, f"Deaths: {state.deaths}", (255, 255, 255))
+        screen.blit(deaths_text, (
+            screen.get_width() / 2 - deaths_text.get_width() / 2,
+            screen.get_height() / 2 + 50
+        ))
+
+        wall_ns = split_timer.wall_splits.get(FINISH_SPLIT)
+        if wall_ns is not None:
+            wall_text = text_cache.render(checkpoint_font, f"Real time: {wall_ns / 1e9:.6f}s", (180, 180, 180))
+            screen.blit(wall_text, (
+                screen.get_width() / 2 - wall_text.get_width() / 2,
+                screen.get_height() / 2 + 160
+            ))
+
+        delta = split_timer.last_delta
+        if split_timer.personal_best:
+            best_line = "New personal best!" if delta is None else f"New personal best! {delta / 1e9:+.3f}s"
+            color = (0, 220, 0)
+        elif delta is not None:
+            best_line, color = f"{delta / 1e9:+.3f}s behind your personal best", (255, 60, 60)
+        else:
+            best_line = None
+        if best_line:
+            best_text = text_cache.render(checkpoint_font, best_line, color)
+            screen.blit(best_text, (
+                screen.get_width() / 2 - best_text.get_width() / 2,
+                screen.get_height() / 2 + 110
+            ))
 
 # Main game loop
-async def main():
+async def main(replay=None, speed=1.0, start=0):
+    """Run the game, or with replay, play it back from tick start at speed times real time"""
     print("Game starting...")
+    init_display()
+    run_store = RunStore()
+    read_best_ghost()  # Decoded once here rather than when the first run starts
+    background_writer.start()
     
     # Menu buttons
     button_yes_death = Button(screen_width // 2 - 150, screen_height // 2, 100, 50, "Yes", (80, 80, 80), (0, 200, 0))
     button_no_death = Button(screen_width // 2 + 50, screen_height // 2, 100, 50, "No", (80, 80, 80), (200, 0, 0))
     button_yes_speedrun = Button(screen_width // 2 - 150, screen_height // 2, 100, 50, "Yes", (80, 80, 80), (0, 200, 0))
     button_no_speedrun = Button(screen_width // 2 + 50, screen_height // 2, 100, 50, "No", (80, 80, 80), (200, 0, 0))
+    phase_buttons = {
+        "death_screen_prompt": (button_yes_death, button_no_death),
+        "speedrun_prompt": (button_yes_speedrun, button_no_speedrun),
+    }
     
     running = True
+    accumulator = 0.0
+    focused = True
+    drawn_phase = None    # Phase currently shown on screen (None forces a full redraw)
+    drawn_hover = ()      # Per-button hover flags as last drawn
+    playback = None
+    if replay is not None:
+        playback = replay.play(start)
+        state.death_screen_enable = False
+        start_ghosts()
+        best = run_store.best(level_stream.digest, state.speedrun_mode)
+        split_timer.best = best[1] if best else {}
 
     while running:
-        dt = clock.tick(60) / 1000
-        current_time = pygame.time.get_ticks()
+        if state.game_phase not in MENU_PHASES:
+            fps = ACTIVE_FPS
+        else:
+            fps = IDLE_FPS if focused else UNFOCUSED_FPS
+        frame_time = min(clock.tick(fps) / 1000, MAX_FRAME_TIME)
+        frame_start = time.perf_counter()
+        start_pressed = False
         
         # Handle events
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.WINDOWFOCUSLOST:
+                focused = False
+            elif event.type in (pygame.WINDOWFOCUSGAINED, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED):
+                focused = True
+                drawn_phase = None
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                start_pressed = True
                 
             # Handle menu clicks
             if state.game_phase == "death_screen_prompt":
@@ -546,226 +2589,82 @@ async def main():
                     print("Speedrun mode disabled")
         
         keys = pygame.key.get_pressed()
+
+        if state.game_phase == "rules" and (start_pressed or keys[pygame.K_SPACE]):
+            state.game_phase = "playing"
+            state.speedrun_start_time = sim_time_ms()
+            rewind_buffer.reset()
+            replay_recorder.start()
+            ghost_recorder.start()
+            start_ghosts()
+            best = run_store.best(level_stream.digest, state.speedrun_mode)
+            split_timer.start(best[1] if best else None)
+            accumulator = 0.0
+            print("Game started!")
+
+        # ===== SIMULATION =====
+        # Physics runs in fixed SIM_DT ticks; rendering interpolates between the last two
+        if state.game_phase == "playing":
+            accumulator += frame_time * speed
+            inputs = read_input(keys)
+            while accumulator >= SIM_DT and state.game_phase == "playing":
+                if playback is not None:
+                    inputs = next(playback, None)
+                    if inputs is None:
+                        accumulator = 0.0  # Replay ran out before the finish: hold its last frame
+                        break
+                step_simulation(inputs)
+                accumulator -= SIM_DT
+            if state.game_phase == "finished" and playback is None:
+                background_writer.submit(save_file, replay_path(), replay_recorder.to_bytes())
+                save_best_ghost()
+                split_timer.personal_best = run_store.save(
+                    level_stream.digest, state.speedrun_mode, state.deaths, split_timer.sim_splits, split_timer.wall_splits
+                )
         
         # ===== RENDER MENU SCREENS =====
-        if state.game_phase == "death_screen_prompt":
-            screen.fill((30, 30, 30))
-            prompt_text = font.render("Enable Death Screen?", True, (255, 255, 255))
-            prompt_rect = prompt_text.get_rect(center=(screen_width // 2, screen_height // 3))
-            screen.blit(prompt_text, prompt_rect)
-            button_yes_death.draw(screen)
-            button_no_death.draw(screen)
-            
-        elif state.game_phase == "speedrun_prompt":
-            screen.fill((30, 30, 30))
-            prompt_text = font.render("Enable Speedrun Mode?", True, (255, 255, 255))
-            prompt_rect = prompt_text.get_rect(center=(screen_width // 2, screen_height // 3))
-            screen.blit(prompt_text, prompt_rect)
-            button_yes_speedrun.draw(screen)
-            button_no_speedrun.draw(screen)
-            
-        elif state.game_phase == "rules":
-            screen.fill((0, 0, 0))
-            lines = [
-                "Welcome to Platform Speedrun!",
-                "Press SPACE to start",
-                "WASD/Arrows to move, SPACE to jump",
-                "R to reset, avoid red spikes!",
-                "Collect checkpoints (purple/green)",
-                "Reach cyan finish line"
-            ]
-            for i, line in enumerate(lines):
-                text_surf = checkpoint_font.render(line, True, (255, 255, 255))
-                screen.blit(text_surf, (screen.get_width() // 2 - text_surf.get_width() // 2, 200 + i * 60))
-            
-            if keys[pygame.K_SPACE]:
-                state.game_phase = "playing"
-                state.speedrun_start_time = pygame.time.get_ticks()
-                print("Game started!")
+        if state.game_phase in MENU_PHASES:
+            buttons = phase_buttons.get(state.game_phase, ())
+            mouse_pos = pygame.mouse.get_pos()
+            hover = tuple(button.is_hovered(mouse_pos) for button in buttons)
+
+            if state.game_phase != drawn_phase:
+                draw_menu_screen(state.game_phase, buttons)
+                pygame.display.flip()
+                drawn_phase = state.game_phase
+            elif hover != drawn_hover:
+                # Only the buttons whose hover state flipped need repainting
+                dirty = [button.rect for button, was, now in zip(buttons, drawn_hover, hover) if was != now]
+                for button in buttons:
+                    if button.rect in dirty:
+                        button.draw(screen)
+                pygame.display.update(dirty)
+            drawn_hover = hover
                 
         # ===== GAME LOOP =====
-        elif state.game_phase == "playing":
-            screen.fill((0, 0, 0))
-            
-            # Check for special collision zones
-            if checkpoints[0]["collected"] or checkpoints[1]["collected"]:
-                checkpoints[0]["collected"] = True
-                checkpoints[1]["collected"] = True
-
-            if (state.player_pos.x >= 2500 and state.player_pos.x <= 7700) and state.player_pos.y >= 979:
-                player_reset()
-            
-            player_rect = pygame.Rect(int(state.player_pos.x), int(state.player_pos.y), state.player_width, state.player_height)
-
-            # Update platforms
-            for mp in moving_platforms:
-                mp.update(dt)
-            for mp in safe_moving_platforms:
-                mp.update(dt)
-
-            # Adjust physics based on position
-            if player_rect.x >= 8000:
-                state.max_jumps = 1000
-                state.gravity = 3000
-            else:
-                state.max_jumps = 2
-                state.gravity = 1500
-
-            # Update moving platform
-            if state.plat_move >= 1200:
-                state.plat_direction = -1
-            elif state.plat_move <= 800:
-                state.plat_direction = 1
-            state.plat_move += 50 * dt * state.plat_direction
-            platforms[3].x = state.plat_move
-
-            # Draw world
-            for ground in ground_rects:
-                pygame.draw.rect(screen, (255, 255, 255), ground.move(-state.camera_offset))
-            pygame.draw.rect(screen, (100, 100, 255), left_wall.move(-state.camera_offset))
-            pygame.draw.rect(screen, (100, 100, 255), right_wall.move(-state.camera_offset))
-
-            for plat in platforms:
-                pygame.draw.rect(screen, (0, 255, 0), plat.move(-state.camera_offset))
-
-            for mp in moving_platforms:
-                pygame.draw.rect(screen, (255, 0, 0), mp.rect.move(-state.camera_offset))
-
-            for mp in safe_moving_platforms:
-                pygame.draw.rect(screen, (0, 255, 0), mp.rect.move(-state.camera_offset))
-
-            # Update camera
-            state.camera_offset.x = state.player_pos.x - screen.get_width() / 2 + state.player_width / 2
-            state.camera_offset.y = state.player_pos.y - screen.get_height() / 2 + state.player_height / 2
-
-            # Physics
-            resolve_collisions(player_rect, platforms, safe_moving_platforms, dt)
-            if not state.on_wall_left and not state.on_wall_right and not state.on_wall_bottom and not state.on_ground:
-                if not state.finish_reached:
-                    state.player_velocity.y += state.gravity * dt
-            else:
-                if state.on_wall_left or state.on_wall_right or state.on_wall_bottom:
-                    state.player_velocity.y = 0
-
-            # Check moving platform collision
-            for mp in moving_platforms:
-                if player_rect.colliderect(mp.rect):
-                    player_reset()
-                    break
-
-            # Check out of bounds
-            if state.player_pos.x > state.game_size or state.player_pos.x < -state.game_size or state.player_pos.y > ground_y + 500:
-                player_reset()
-            
-            # Movement
-            if keys[pygame.K_a] or keys[pygame.K_LEFT]:
-                state.player_velocity.x = -state.move_speed
-            elif keys[pygame.K_d] or keys[pygame.K_RIGHT]:
-                state.player_velocity.x = state.move_speed
-            else:
-                state.player_velocity.x = 0
+        else:
+            scale = resolution_scaler.scale if dynamic_resolution else 1
+            draw_playing(accumulator / SIM_DT, scale)
+            pygame.display.flip()
+            drawn_phase = None
+            if dynamic_resolution:
+                resolution_scaler.record(time.perf_counter() - frame_start)
+            level_stream.pump()
 
-            # Rotation
-            if state.on_wall_left:
-                state.target_rotation = -90
-            elif state.on_wall_right:
-                state.target_rotation = 90
-            else:
-                state.target_rotation = 0
-            state.rotation += (state.target_rotation - state.rotation) * min(10 * dt, 1)
-
-            # Jump
-            jump_pressed = keys[pygame.K_SPACE] or keys[pygame.K_w] or keys[pygame.K_UP]
-            if jump_pressed and current_time - state.last_jump_time >= state.jump_cooldown and state.jump_count < state.max_jumps:
-                state.player_velocity.y = -state.jump_strength
-                state.jump_count += 1
-                state.last_jump_time = current_time
-            
-            # Reset
-            if keys[pygame.K_r]:
-                player_reset()
-
-            # Draw spikes
-            for spike in spikes:
-                spike_screen = [(int(x - state.camera_offset.x), int(y - state.camera_offset.y)) for x, y in spike]
-                pygame.draw.polygon(screen, (255, 0, 0), spike_screen)
-
-            # Draw player
-            rotated_player = pygame.Surface((state.player_width, state.player_height), pygame.SRCALPHA)
-            rotated_player.fill((255, 0, 0))
-            pygame.draw.rect(rotated_player, (255, 255, 255), (0, 0, state.player_width, 10))
-            rotated_player = pygame.transform.rotate(rotated_player, -state.rotation)
-            rect = rotated_player.get_rect(center=player_rect.move(-state.camera_offset).center)
-            screen.blit(rotated_player, rect)
-
-            # Check spike collision
-            if check_collision_with_spikes(player_rect):
-                player_reset()
-
-            # Check checkpoints
-            for cp in checkpoints:
-                if not cp["collected"] and player_rect.colliderect(cp["rect"]):
-                    cp["collected"] = True
-                    state.player_pos_reset.update(cp["rect"].x, cp["rect"].y)
-                    print(f"Checkpoint reached!")
-
-            # Draw checkpoints
-            for cp in checkpoints:
-                color = (0, 255, 0) if cp["collected"] else (150, 50, 220)
-                pygame.draw.rect(screen, color, cp["rect"].move(-state.camera_offset), 3)
-
-            # Draw finish line
-            pygame.draw.rect(screen, (0, 255, 255), finish_rect.move(-state.camera_offset))
-
-            # Check finish
-            if player_rect.colliderect(finish_rect) and not state.finish_reached and (all(cp["collected"] for cp in checkpoints) or state.speedrun_mode):
-                state.finish_reached = True
-                state.finish_time = pygame.time.get_ticks() - state.speedrun_start_time
-                state.game_phase = "finished"
-                print(f"FINISH! Time: {state.finish_time/1000:.2f}s, Deaths: {state.deaths}")
-
-            # Draw UI
-            cp_text = checkpoint_font.render(f"Checkpoints: {sum(cp['collected'] for cp in checkpoints)}/{len(checkpoints)}", True, (255, 255, 0))
-            screen.blit(cp_text, (10, 10))
-
-            fps = clock.get_fps()
-            fps_text = fps_font.render(f"FPS: {int(fps)}", True, (255, 255, 0))
-            screen.blit(fps_text, (10, 50))
-
-            speedrun_time = (pygame.time.get_ticks() - state.speedrun_start_time) / 1000
-            speed_text = checkpoint_font.render(f"Time: {speedrun_time:.2f}s", True, (255, 255, 0))
-            screen.blit(speed_text, (10, 90))
-
-            death_counter = checkpoint_font.render(f"Deaths: {state.deaths}", True, (255, 255, 0))
-            screen.blit(death_counter, (10, 130))
-            
-        elif state.game_phase == "finished":
-            screen.fill((0, 0, 0))
-            minutes = state.finish_time // 60000
-            seconds = (state.finish_time % 60000) // 1000
-            milliseconds = (state.finish_time % 1000) // 10
-            
-            finish_text = font.render(
-                f"FINISH! Time: {minutes:02}:{seconds:02}.{milliseconds:02}",
-                True,
-                (0, 255, 255)
-            )
-            screen.blit(finish_text, (
-                screen.get_width() / 2 - finish_text.get_width() / 2,
-                screen.get_height() / 2 - 50
-            ))
-            
-            deaths_text = checkpoint_font.render(f"Deaths: {state.deaths}", True, (255, 255, 255))
-            screen.blit(deaths_text, (
-                screen.get_width() / 2 - deaths_text.get_width() / 2,
-                screen.get_height() / 2 + 50
-            ))
-
-        pygame.display.flip()
         await asyncio.sleep(0)  # Critical for Pygbag!
 
+    background_writer.close()
     pygame.quit()
 
 # Run the game
-
-asyncio.run(main())
+if __name__ == "__main__":
+    if "--verify-replays" in sys.argv:
+        verify_main(sys.argv[1:])
+    elif "--replay" in sys.argv:
+        replay_main(sys.argv[1:])
+    elif "--headless" in sys.argv:
+        headless_main(sys.argv[1:])
+    elif "--convert-level" in sys.argv or "--compile-level" in sys.argv:
+        level_tool_main(sys.argv[1:])
+    else:
+        game_main(sys.argv[1:])